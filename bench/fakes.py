@@ -0,0 +1,299 @@
+# 本地模拟服务: 校园网认证、松果云、iKuai路由器、IP查询与工作站RDP端口
+import hashlib
+import hmac
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+
+class Faults:
+    """延迟与丢包注入
+
+    :param latency: 平均响应延迟(秒)
+    :param jitter: 延迟的随机波动(秒)
+    :param loss: 直接断开连接而不响应的概率
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+
+    def delay(self):
+        return max(self.latency + random.uniform(-self.jitter, self.jitter), 0)
+
+    def dropped(self):
+        return random.random() < self.loss
+
+
+class Workstation:
+    """模拟工作站: 开机后经过 boot_delay 秒RDP端口才接受连接"""
+
+    def __init__(self, boot_delay=5.0, name="workstation", mac="00:11:22:33:44:55"):
+        self.boot_delay = boot_delay
+        self.name = name
+        self.mac = mac
+        self.powered_at = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._bind()
+        self.port = self._sock.getsockname()[1]
+
+    def _bind(self, port=0):
+        self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+
+    def power_on(self):
+        with self._lock:
+            if self.powered_at is not None:
+                return
+            self.powered_at = time.monotonic()
+        threading.Timer(self.boot_delay, self._boot).start()
+
+    def _boot(self):
+        with self._lock:
+            if self.powered_at is None:
+                return
+            sock = self._sock
+            sock.listen()
+        threading.Thread(target=self._accept, args=(sock,), daemon=True).start()
+
+    def _accept(self, sock):
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            conn.close()
+
+    @property
+    def status(self):
+        """松果云设备状态: 1 开机, 0 关机"""
+        return 0 if self.powered_at is None else 1
+
+    def reset(self):
+        with self._lock:
+            booted = self.powered_at is not None
+            self.powered_at = None
+            if booted:
+                try:
+                    # 唤醒阻塞在 accept 的线程, 否则端口不会释放
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self._sock.close()
+                self._bind(self.port)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parts = urlsplit(self.path)
+        server.calls += 1
+        time.sleep(server.faults.delay())
+        if server.faults.dropped():
+            self.close_connection = True
+            return
+        route = server.routes.get(parts.path)
+        if route is None:
+            return self._reply(404, b"not found")
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+        result = route(parse_qs(parts.query), payload)
+        if result is None:
+            # 模拟认证前HTTPS被拦截: 不响应直接断开
+            self.close_connection = True
+            return
+        status, content = result
+        if not isinstance(content, bytes):
+            content = content.encode() if isinstance(content, str) else \
+                json.dumps(content).encode()
+        self._reply(status, content)
+
+    def _reply(self, status, content):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_HEAD = _handle
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, routes, faults=None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.routes = routes
+        self.faults = faults or Faults()
+        self.calls = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class Network:
+    """组合所有模拟服务, 提供一份指向它们的 settings"""
+
+    def __init__(self, boot_delay=5.0, portal=None, cloud=None, router=None,
+                 ip_service=None, probe=None):
+        self.workstation = Workstation(boot_delay)
+        self.logged_in = False
+        self.challenges = []
+        self.portal = FakeServer({
+            "/": lambda q, p: (200, "portal"),
+            "/cgi-bin/srun_portal": self._srun_portal,
+            "/cgi-bin/get_challenge": self._srun_challenge,
+            "/cgi-bin/rad_user_info": self._srun_info,
+        }, portal)
+        self.probe = FakeServer({
+            "/generate_204": self._generate_204,
+            "/": self._generate_204,
+        }, probe)
+        self.cloud = FakeServer({
+            "/Esp_Api_advance.php": self._list_devices,
+            "/Esp_Api_new.php": self._set_power,
+        }, cloud)
+        self.router = FakeServer({
+            "/Action/login": lambda q, p: (200, {"Result": 10000, "ErrMsg": "Success"}),
+            "/Action/call": self._router_call,
+        }, router)
+        self.ip_service = FakeServer({
+            "/": lambda q, p: (200, {"wan": ["127.0.0.1"], "lan": ["127.0.0.1"]}),
+        }, ip_service)
+
+    def reset(self):
+        self.logged_in = False
+        self.workstation.reset()
+
+    # {{{ 校园网认证
+
+    def _generate_204(self, query, payload):
+        if not self.logged_in:
+            # 认证前被重定向到认证页
+            return 302, b""
+        return 204, b""
+
+    def _srun_signed(self, query):
+        """按认证服务器的规则校验 password 与 chksum, token 须为本服务发出的 challenge"""
+        field = {key: values[0] for key, values in query.items()}
+        for token in self.challenges:
+            hmd5 = hmac.new(token.encode(), b"bench", hashlib.md5).hexdigest()
+            chksum = hashlib.sha1("".join(token + value for value in [
+                field.get("username", ""), hmd5, field.get("ac_id", ""),
+                field.get("ip", ""), field.get("n", ""), field.get("type", ""),
+                field.get("info", "")]).encode()).hexdigest()
+            if field.get("password") == "{MD5}" + hmd5 and field.get("chksum") == chksum:
+                return True
+        return False
+
+    def _srun_portal(self, query, payload):
+        action = query.get("action", ["login"])[0]
+        callback = query.get("callback", [""])[0]
+        if action == "login" and not (self._srun_signed(query) if query.get("chksum")
+                                      else query.get("password")):
+            body = json.dumps({"error": "sign_error", "res": "sign_error"})
+            return 200, f"{callback}({body})" if callback else body
+        self.logged_in = action == "login"
+        body = json.dumps({"error": "ok", "res": "ok", "suc_msg": "login_ok"
+                           if self.logged_in else "logout_ok"})
+        return 200, f"{callback}({body})" if callback else body
+
+    def _srun_challenge(self, query, payload):
+        callback = query.get("callback", [""])[0]
+        challenge = "%064x" % random.getrandbits(256)
+        self.challenges.append(challenge)
+        body = json.dumps({"challenge": challenge,
+                           "client_ip": "127.0.0.1", "error": "ok", "res": "ok"})
+        return 200, f"{callback}({body})" if callback else body
+
+    def _srun_info(self, query, payload):
+        callback = query.get("callback", [""])[0]
+        body = json.dumps({"error": "ok" if self.logged_in else "not_online_error",
+                           "online_ip": "127.0.0.1"})
+        return 200, f"{callback}({body})" if callback else body
+
+    # }}}
+
+    # {{{ 松果云
+
+    def _list_devices(self, query, payload):
+        devices = {"deviceslist": [{"deviceName": self.workstation.name,
+                                    "status": str(self.workstation.status)}]}
+        return 200, quote(json.dumps(devices))
+
+    def _set_power(self, query, payload):
+        if payload and int(payload.get("value", 0)) == 1:
+            self.workstation.power_on()
+        return 200, quote(json.dumps({"status": "0"}))
+
+    # }}}
+
+    def _router_call(self, query, payload):
+        func_name = (payload or {}).get("func_name")
+        data = {}
+        if func_name == "wakeup":
+            self.workstation.power_on()
+        elif func_name == "wan":
+            data = {"vlan_data": [{"dhcp_ip_addr": "127.0.0.1"}], "vlan_total": 1}
+        elif func_name == "monitor_lanip":
+            data = {"data": [{"ip_addr": "127.0.0.1",
+                              "mac": self.workstation.mac}], "total": 1}
+        return 200, {"Result": 30000, "ErrMsg": "Success", "Data": data}
+
+    def settings(self):
+        """与 settings.py 同名的配置项"""
+        import sys
+        login = (f'"{sys.executable}" -c "import urllib.request;'
+                 f"urllib.request.urlopen('{self.portal.url}/cgi-bin/srun_portal"
+                 f"?action=login')\"")
+        return {
+            "WIFI_SSID": "bench",
+            "network_backend": "fake",
+            "SRUN_CMD": login,
+            "srun_url": self.portal.url,
+            "srun_username": "bench",
+            "srun_password": "bench",
+            "portal_host": "127.0.0.1",
+            "portal_port": self.portal.port,
+            "online_url": f"{self.probe.url}/generate_204",
+            "online_probes": [f"{self.probe.url}/generate_204|204",
+                              f"{self.probe.url}/|204"],
+            "wake_url": self.cloud.url,
+            "wake_username": "bench",
+            "wake_password": "bench",
+            "wake_mac": self.workstation.mac,
+            # 不发送魔术包, 避免基准测试向真实网络广播
+            "wake_mechanisms": ["cloud", "ikuai"],
+            "ikuai_url": self.router.url,
+            "ikuai_username": "admin",
+            "ikuai_password": "admin",
+            "ip_url": self.ip_service.url + "/",
+            "rdp_host": "127.0.0.1",
+            "rdp_port": self.workstation.port,
+            "rdp_file": "full address:s:$$address$$\n",
+            "rdp_temp_file": "bench.rdp",
+        }
@@ -0,0 +1,132 @@
+# 基准测试: 在本地模拟服务上执行任务, 统计端到端与各步骤耗时分位数
+#   python -m bench.run --runs 20 --boot-delay 8 --cloud-latency 0.3 --cloud-loss 0.1
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fakes import Faults, Network  # noqa: E402
+
+PROCEDURES = ["procedure.wifi", "procedure.workstation", "procedure.rdp"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = (len(values) - 1) * q / 100
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+def install_settings(network, extra=None):
+    settings = types.ModuleType("settings")
+    for key, value in dict(network.settings(), **(extra or {})).items():
+        setattr(settings, key, value)
+    sys.modules["settings"] = settings
+    for name in PROCEDURES:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端基准测试")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--boot-delay", type=float, default=5.0, help="工作站开机耗时(秒)")
+    parser.add_argument("--warm", action="store_true",
+                        help="保留 state.json 与登录状态, 测试热启动")
+    parser.add_argument("--exclude", nargs="*", default=["rdp.connect"],
+                        help="不执行的步骤 (默认不启动RDP客户端)")
+    for name in ["portal", "probe", "cloud", "router", "ip"]:
+        parser.add_argument(f"--{name}-latency", type=float, default=0.0)
+        parser.add_argument(f"--{name}-jitter", type=float, default=0.0)
+        parser.add_argument(f"--{name}-loss", type=float, default=0.0)
+    args = parser.parse_args()
+
+    def faults(name):
+        return Faults(getattr(args, f"{name}_latency"),
+                      getattr(args, f"{name}_jitter"),
+                      getattr(args, f"{name}_loss"))
+
+    network = Network(boot_delay=args.boot_delay, portal=faults("portal"),
+                      probe=faults("probe"), cloud=faults("cloud"),
+                      router=faults("router"), ip_service=faults("ip"))
+    workdir = tempfile.mkdtemp(prefix="surface-bench-")
+    install_settings(network, {"rdp_temp_file": os.path.join(workdir, "bench.rdp")})
+
+    import remote.wake
+    from runner import console, plan, scheduler, state
+    from runner.console import print
+    from runner.trace import Tracer
+
+    console.load()
+    state.PATH = os.path.join(workdir, "state.json")
+    steps = plan.load(os.path.join(os.path.dirname(plan.__file__), "..",
+                                   "procedure", "procedure.json"))
+    only = {step["id"] for step in steps} - set(args.exclude)
+
+    totals = []
+    durations = {}
+    failures = 0
+    calls = {}
+    for number in range(args.runs):
+        if not args.warm or number == 0:
+            network.reset()
+            state.flush()
+            state._data = None
+            if os.path.exists(state.PATH):
+                os.remove(state.PATH)
+        else:
+            network.workstation.reset()
+        for name in PROCEDURES:
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+        # 每次运行都是一次新的开机, 不沿用上次的唤醒去重记录
+        remote.wake._fired.clear()
+        before = {name: getattr(network, name).calls
+                  for name in ["portal", "probe", "cloud", "router", "ip_service"]}
+        tracer = Tracer()
+        start = time.monotonic()
+        ok = scheduler.run(steps, workers=args.workers, tracer=tracer, only=only)
+        totals.append(time.monotonic() - start)
+        failures += not ok
+        for record in tracer.steps.values():
+            if record["end"] is not None:
+                durations.setdefault(record["id"], []).append(
+                    record["end"] - record["start"])
+        for name, count in before.items():
+            calls.setdefault(name, []).append(getattr(network, name).calls - count)
+
+    from rich.table import Table
+
+    table = Table(title=f"{args.runs} 次运行 (开机耗时 {args.boot_delay:g}s, 失败 {failures} 次)")
+    for column in ["阶段", "p50", "p90", "p99", "最大"]:
+        table.add_column(column, justify="left" if column == "阶段" else "right")
+
+    def row(name, values):
+        table.add_row(name, *[f"{v:.3f}s" for v in [
+            percentile(values, 50), percentile(values, 90),
+            percentile(values, 99), max(values)]])
+
+    row("[bold]端到端[/bold]", totals)
+    for step in steps:
+        if step["id"] in durations:
+            row(step["id"], durations[step["id"]])
+    print(table)
+    print("平均请求次数: " + ", ".join(
+        f"{name} {sum(values) / len(values):.1f}" for name, values in calls.items()))
+    if "net.transport" in sys.modules:
+        print("共享连接池: " + ", ".join(
+            f"{host} 请求 {stat['requests']} 次/新建连接 {stat.get('connections', 0)} 个"
+            for host, stat in sys.modules["net.transport"].transport.metrics().items()))
+
+
+if __name__ == "__main__":
+    main()
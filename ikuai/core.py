@@ -1,6 +1,7 @@
 import base64
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import quote, urljoin
 
@@ -61,16 +62,24 @@ class QueryRPParam:
 
 
 class IKuaiClient:  # noqa
-    def __init__(self, url, username, password):
+    def __init__(self, url, username, password, session_factory=None,
+                 page_size=100):
+        """
+        :param session_factory: 创建 requests 会话的函数, 用于共享连接池,
+                                默认为 requests.session
+        :param page_size: iter_* 方法每次请求的条数
+        """
+        self.page_size = page_size
         self._username = username
         self._passwd = password
         self.base_url = url.strip().rstrip("/")
+        self._session_factory = session_factory or requests.session
         self._session = None
 
     @property
     def session(self):
         if self._session is None:
-            self._session = requests.session()
+            self._session = self._session_factory()
             self.authenticate()
 
         return self._session
@@ -84,7 +93,7 @@ class IKuaiClient:  # noqa
             'remember_password': "",
             'username': self._username
         }
-        self._session = requests.session()
+        self._session = self._session_factory()
 
         response = (
             self._session.post(f'{self.base_url}/Action/login', json=login_info))
@@ -101,6 +110,32 @@ class IKuaiClient:  # noqa
                 f"{content[JSON_RESPONSE_RESULT]}: {content[JSON_RESPONSE_ERRMSG]}."
             )
 
+    def _paginate(self, list_func, page_size=None, data_key="data",
+                  total_key="total", **query_kwargs):
+        """逐条返回 list_func 的全部结果, 消费当前页时后台请求下一页
+
+        limit 按 "偏移,条数" 传给路由器. 返回 total 时取到 total 条 (或某页为空) 为止,
+        路由器可能限制单页条数, 不足 page_size 的页不代表结束; 没有 total 时某页不足 page_size 条即结束.
+        """
+        page_size = page_size or self.page_size
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            offset = 0
+            future = pool.submit(
+                list_func, limit=[offset, page_size], **query_kwargs)
+            while future is not None:
+                page = future.result() or {}
+                rows = page.get(data_key) or []
+                total = page.get(total_key)
+                offset += len(rows)
+                if total is None:
+                    more = len(rows) == page_size
+                else:
+                    more = bool(rows) and offset < int(total)
+                future = pool.submit(
+                    list_func, limit=[offset, page_size], **query_kwargs
+                ) if more else None
+                yield from rows
+
     def list_protocols_json(self):
         response = self.session.get(
             urljoin(self.base_url, "json/protocols_cn.json"), headers={
@@ -209,6 +244,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_mac_groups(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_mac_groups, page_size, **query_kwargs)
+
     def edit_mac_group(self, group_id, group_name, addr_pools, comments=None):
         comments = comments or []
         return self.exec(
@@ -290,6 +328,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_acl_l7(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_acl_l7, page_size, **query_kwargs)
+
     def edit_acl_l7(self, acl_l7_id, comment, src_addrs, action, dst_addrs=None,
                     prio=32, app_protos=None, enabled=True, time="00:00-23:59",
                     week="1234567"):
@@ -373,6 +414,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_domain_blacklist(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_domain_blacklist, page_size, **query_kwargs)
+
     def add_domain_blacklist(
             self, enabled=True,
             ipaddrs=None,
@@ -466,6 +510,10 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_monitor_lanip(self, ip_type="v4", page_size=None, **query_kwargs):
+        return self._paginate(
+            self.list_monitor_lanip, page_size, ip_type=ip_type, **query_kwargs)
+
     # {{{ mac_comment CRUD
     # 行为管控 之 终端名称管理
 
@@ -478,6 +526,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_mac_comment(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_mac_comment, page_size, **query_kwargs)
+
     def del_mac_comment(self, mac_comment_id):
         return self.exec(
             func_name=rp_func_name.mac_comment,
@@ -545,6 +596,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_acl_mac(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_acl_mac, page_size, **query_kwargs)
+
     def add_acl_mac(
             self,
             mac,
@@ -630,6 +684,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_mac_qos(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_mac_qos, page_size, **query_kwargs)
+
     def _get_mac_qos_param(
             self,
             mac_addrs,
@@ -819,6 +876,9 @@ class IKuaiClient:  # noqa
         )
         return result[JSON_RESPONSE_DATA]
 
+    def iter_url_black(self, page_size=None, **query_kwargs):
+        return self._paginate(self.list_url_black, page_size, **query_kwargs)
+
     def _get_url_black_param(
             self,
             ip_addrs,
@@ -941,23 +1001,27 @@ class IKuaiClient:  # noqa
             }
         )
 
-    def list_vwanips(self):
+    def _list_vwan(self, limit):
         res=self.exec(
             func_name=rp_func_name.vwanips,
             action=rp_action.show,
             param={
                 "TYPE": "vlan_data,vlan_total",
                 "interface": "wan1",
-                "limit": "0,20",
+                "limit": ",".join(map(str, limit)),
                 "ORDER_BY": "id",
                 "ORDER": "desc",
                 "vlan_internet": 1
             }
         )
-        ans=[]
-        for i in res["Data"]["vlan_data"]:
-            ans.append(i["dhcp_ip_addr"])
-        return ans
+        return res["Data"]
+
+    def iter_vwanips(self, page_size=None):
+        return self._paginate(self._list_vwan, page_size,
+                              data_key="vlan_data", total_key="vlan_total")
+
+    def list_vwanips(self):
+        return [i["dhcp_ip_addr"] for i in self.iter_vwanips()]
     
     def wake_on_lan(self,MAC):
         res=self.exec(
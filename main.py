@@ -1,40 +1,58 @@
 # 执行任务
-import json
+import argparse
 import os
 import sys
-import time
-import importlib
-from rich import print
 
-f=open("./procedure/procedure.json","r",encoding="utf-8")
-procedures=json.loads(f.read())
-f.close()
+from runner import plan, scheduler, supervisor
+from runner.console import print
+from runner.trace import Tracer
 
-for procedure in procedures:
-    print("执行任务: "+procedure["description"])
-    try:
-        module=importlib.import_module(procedure["path"])
-    except Exception as e:
-        print("[red]任务模块加载失败![/red]")
-        print("[red]错误信息: "+str(e)+"[/red]")
-        sys.exit(1)
-    for step in procedure["steps"]:
-        while True:
-            try:
-                print("    执行步骤: "+step["description"],end="  ")
-                res=eval(f"module{step['path'].replace(procedure["path"],"")}")()
-                if type(res)==str:
-                    print(res)
-                else:
-                    print("[green]正常[/green]" if res else "[red]异常[/red]")
-                break
-            except Exception as e:
-                print("[red]失败[/red]")
-                print("    [red]错误信息: "+str(e)+"[/red]")
-                print("    [red]3s后重试...[/red]",end="\r")
-                time.sleep(3)
+parser = argparse.ArgumentParser(description="Surface远程终端")
+parser.add_argument("--workers", type=int, default=4, help="并行执行的步骤数")
+parser.add_argument("--trace-dir", default="trace",
+                    help="执行记录的输出目录 (steps.jsonl 与 trace.json)")
+parser.add_argument("--profile", action="store_true", help="结束后输出关键路径耗时")
+parser.add_argument("--daemon", action="store_true",
+                    help="守护模式: 持续执行健康检查并重新执行失效的步骤")
+parser.add_argument("--interval", type=float, default=30, help="守护模式的检查间隔(秒)")
+args = parser.parse_args()
+
+try:
+    steps = plan.load("./procedure/procedure.json")
+except scheduler.PlanError as e:
+    print("[red]任务配置错误: " + str(e) + "[/red]")
+    sys.exit(1)
+plan.preload(steps)
 
 
+def save_trace(tracer, ok):
+    try:
+        tracer.write_jsonl(os.path.join(args.trace_dir, "steps.jsonl"))
+        tracer.write_chrome(os.path.join(args.trace_dir, "trace.json"))
+    except OSError as e:
+        print("[red]执行记录写入失败: " + str(e) + "[/red]")
+    if args.profile:
+        tracer.print_profile()
+        if "net.transport" in sys.modules:
+            for host, stat in sys.modules["net.transport"].transport.metrics().items():
+                print(f"{host}: 请求 {stat['requests']} 次, 失败 {stat['errors']} 次, "
+                      f"新建连接 {stat.get('connections', 0)} 个")
+        if "remote.launcher" in sys.modules:
+            stat = sys.modules["remote.launcher"].metrics()
+            if stat:
+                print(f"远程桌面重连 {stat['count']} 次 (另有 {stat['unstable']} 次重连后很快退出), "
+                      f"恢复稳定平均 {stat['mean']:.1f}s, 最长 {stat['max']:.1f}s")
 
 
+if args.daemon:
+    try:
+        supervisor.Supervisor(steps, workers=args.workers, interval=args.interval,
+                              on_pass=save_trace).run()
+    except KeyboardInterrupt:
+        sys.exit(0)
 
+tracer = Tracer()
+ok = scheduler.run(steps, workers=args.workers, tracer=tracer)
+save_trace(tracer, ok)
+if not ok:
+    sys.exit(1)
@@ -0,0 +1,112 @@
+# 基于 asyncio 的简易HTTP客户端, 供协程步骤使用 (不依赖第三方库)
+import asyncio
+import json as jsonlib
+import ssl
+from urllib.parse import urlencode, urlsplit
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, url, status, headers, content):
+        self.url = url
+        self.status_code = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return jsonlib.loads(self.text)
+
+
+async def _read_body(reader, headers):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                await reader.readline()
+                return body
+            body += await reader.readexactly(size)
+            await reader.readline()
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    return await reader.read()
+
+
+async def _request(method, url, params, json, headers):
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    host = parts.hostname
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    query = parts.query
+    if params:
+        query = (query + "&" if query else "") + urlencode(params)
+    if query:
+        path += "?" + query
+
+    body = b""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}",
+             "Connection: close", "Accept-Encoding: identity",
+             "User-Agent: surface"]
+    if json is not None:
+        body = jsonlib.dumps(json).encode()
+        lines.append("Content-Type: application/json")
+    if body or method in ["POST", "PUT"]:
+        lines.append(f"Content-Length: {len(body)}")
+    for key, value in (headers or {}).items():
+        lines.append(f"{key}: {value}")
+
+    reader, writer = await asyncio.open_connection(
+        host, port, ssl=ssl.create_default_context() if secure else None)
+    try:
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        status_line = (await reader.readline()).decode("latin-1").split()
+        if len(status_line) < 2:
+            raise HTTPError(f"无效的HTTP响应: {url}")
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+        content = b"" if method == "HEAD" else await _read_body(
+            reader, response_headers)
+        return Response(url, int(status_line[1]), response_headers, content)
+    finally:
+        writer.close()
+
+
+async def request(method, url, params=None, json=None, headers=None, timeout=5):
+    """发送请求并读取完整响应, 超时抛出 asyncio.TimeoutError, 不跟随重定向"""
+    return await asyncio.wait_for(
+        _request(method, url, params, json, headers), timeout)
+
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
+
+
+async def probe_tcp(host, port, timeout=1):
+    """TCP连接成功返回握手耗时(秒), 失败返回 None"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.close()
+    return loop.time() - start
@@ -0,0 +1,290 @@
+# 网络后端: 连接WIFI并推送链路/地址变化事件
+#   NetshBackend   Windows, netsh wlan
+#   NmcliBackend   Linux, NetworkManager (nmcli monitor)
+#   FakeBackend    内存模拟, 供测试与基准测试使用
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+
+
+class LinkState:
+    def __init__(self, connected=False, ssid=None, address=None):
+        self.connected = connected
+        self.ssid = ssid
+        self.address = address
+
+    def __eq__(self, other):
+        return isinstance(other, LinkState) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return (f"LinkState(connected={self.connected}, ssid={self.ssid!r}, "
+                f"address={self.address!r})")
+
+
+def route_address(host="10.0.0.55"):
+    """发往 host 时使用的本机地址, 没有可用路由时返回 None (不发送数据包)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.connect((host, 80))
+        address = sock.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    return None if address.startswith(("0.", "169.254.")) else address
+
+
+class Backend:
+    def __init__(self):
+        self.state = LinkState()
+        self._listeners = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = threading.Event()
+        # 有等待者时置位, 让轮询式后端立即查询并切换到短间隔
+        self._wake = threading.Event()
+        self._waiting = 0
+
+    def subscribe(self, callback):
+        """状态变化时调用 callback(old, new), 在后端的监视线程中执行"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _emit(self, state):
+        with self._cond:
+            if state == self.state:
+                return
+            old, self.state = self.state, state
+            self._cond.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(old, state)
+            except Exception:
+                pass
+
+    def start(self):
+        if self._thread is None:
+            self._emit(self.query())
+            self._thread = threading.Thread(target=self._monitor, daemon=True,
+                                            name=type(self).__name__)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    @property
+    def busy(self):
+        """是否有等待状态变化的调用者或订阅者"""
+        return self._waiting > 0 or bool(self._listeners)
+
+    def _begin_wait(self):
+        with self._cond:
+            self._waiting += 1
+        self._wake.set()
+
+    def _end_wait(self):
+        with self._cond:
+            self._waiting -= 1
+
+    def wait_for(self, predicate, timeout=None):
+        """等待 predicate(state) 为真, 超时返回 False"""
+        self.start()
+        self._begin_wait()
+        try:
+            with self._cond:
+                return self._cond.wait_for(lambda: predicate(self.state), timeout)
+        finally:
+            self._end_wait()
+
+    def wait_address(self, timeout=None):
+        return self.wait_for(lambda s: s.connected and s.address, timeout)
+
+    async def wait_for_async(self, predicate, timeout=None):
+        """wait_for 的协程版本, 由状态变化事件唤醒"""
+        import asyncio
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def callback(old, new):
+            if predicate(new):
+                loop.call_soon_threadsafe(event.set)
+
+        self.subscribe(callback)
+        self._wake.set()
+        try:
+            if not predicate(self.state):
+                await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.unsubscribe(callback)
+
+    async def wait_address_async(self, timeout=None):
+        return await self.wait_for_async(
+            lambda s: s.connected and s.address, timeout)
+
+    def connect(self, ssid):
+        raise NotImplementedError
+
+    def query(self):
+        """查询当前状态"""
+        raise NotImplementedError
+
+    def _monitor(self):
+        raise NotImplementedError
+
+
+class NetshBackend(Backend):
+    """Windows 没有不依赖 pywin32 的链路事件接口, 查询状态并在变化时推送
+
+    有调用者等待状态变化时每 interval 秒查询一次, 其余时间每 idle_interval 秒查询一次,
+    避免守护模式下一直频繁启动 netsh.
+    """
+
+    def __init__(self, route_host="10.0.0.55", interval=0.2, idle_interval=30):
+        super().__init__()
+        self.route_host = route_host
+        self.interval = interval
+        self.idle_interval = idle_interval
+
+    def connect(self, ssid):
+        self.start()
+        subprocess.run(["netsh", "wlan", "connect", f"name={ssid}"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def query(self):
+        try:
+            output = subprocess.run(
+                ["netsh", "wlan", "show", "interfaces"], capture_output=True,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            ).stdout.decode(errors="ignore")
+        except OSError:
+            output = ""
+        # 输出随系统语言变化, 只有 SSID 字段名固定
+        match = re.search(r"^\s*SSID\s*:\s*(.+?)\s*$", output, re.MULTILINE)
+        ssid = match.group(1) if match else None
+        address = route_address(self.route_host) if ssid else None
+        return LinkState(connected=ssid is not None, ssid=ssid, address=address)
+
+    def _monitor(self):
+        while not self._stopped.is_set():
+            if self._wake.wait(self.interval if self.busy else self.idle_interval):
+                self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self._emit(self.query())
+
+
+class NmcliBackend(Backend):
+    """通过 nmcli monitor 接收 NetworkManager 事件, 每个事件后查询一次状态"""
+
+    def __init__(self, device=None):
+        super().__init__()
+        self.device = device
+
+    def _wifi_device(self):
+        if self.device is None:
+            output = subprocess.run(["nmcli", "-t", "-f", "DEVICE,TYPE", "device"],
+                                    capture_output=True, text=True).stdout
+            for line in output.splitlines():
+                name, _, kind = line.rpartition(":")
+                if kind == "wifi":
+                    self.device = name
+                    break
+        return self.device
+
+    def connect(self, ssid):
+        self.start()
+        subprocess.run(["nmcli", "--wait", "0", "connection", "up", "id", ssid],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def query(self):
+        device = self._wifi_device()
+        if device is None:
+            return LinkState()
+        output = subprocess.run(
+            ["nmcli", "-t", "-f", "GENERAL.STATE,GENERAL.CONNECTION,IP4.ADDRESS",
+             "device", "show", device], capture_output=True, text=True).stdout
+        fields = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(":")
+            fields.setdefault(key.split("[")[0], value)
+        connected = fields.get("GENERAL.STATE", "").startswith("100")
+        address = fields.get("IP4.ADDRESS", "").split("/")[0] or None
+        return LinkState(connected=connected,
+                         ssid=fields.get("GENERAL.CONNECTION") or None,
+                         address=address if connected else None)
+
+    def _monitor(self):
+        process = subprocess.Popen(["nmcli", "monitor"], stdout=subprocess.PIPE,
+                                   text=True)
+        for _ in process.stdout:
+            if self._stopped.is_set():
+                break
+            self._emit(self.query())
+        process.terminate()
+
+
+class FakeBackend(Backend):
+    """内存模拟: connect 后经过 associate_delay 秒关联, 再经过 dhcp_delay 秒获得地址"""
+
+    def __init__(self, state=None, associate_delay=0.5, dhcp_delay=1.0,
+                 address="127.0.0.1"):
+        super().__init__()
+        self.state = state or LinkState()
+        self.associate_delay = associate_delay
+        self.dhcp_delay = dhcp_delay
+        self.address = address
+
+    def set_state(self, **kwargs):
+        self._emit(LinkState(**dict(vars(self.state), **kwargs)))
+
+    def connect(self, ssid):
+        def associate():
+            self.set_state(connected=True, ssid=ssid, address=None)
+            threading.Timer(self.dhcp_delay, lambda: self.set_state(
+                address=self.address)).start()
+
+        threading.Timer(self.associate_delay, associate).start()
+
+    def query(self):
+        return self.state
+
+    def start(self):
+        return self
+
+    def _monitor(self):
+        pass
+
+
+def default(name=None, route_host="10.0.0.55"):
+    """按名称或当前平台选择后端: netsh / nmcli / fake
+
+    模拟后端只在明确指定 fake 时使用; 当前平台没有可用的后端时抛出异常.
+
+    :param route_host: netsh 后端判断是否已获得地址时使用的目标地址
+    """
+    if name is None:
+        if sys.platform == "win32":
+            name = "netsh"
+        elif shutil.which("nmcli"):
+            name = "nmcli"
+        else:
+            raise RuntimeError("没有可用的网络后端 (需要 Windows netsh 或 NetworkManager nmcli), "
+                               "可在 settings.network_backend 中指定")
+    if name == "netsh":
+        return NetshBackend(route_host=route_host)
+    backends = {"nmcli": NmcliBackend, "fake": FakeBackend}
+    if name not in backends:
+        raise ValueError(f"未知的网络后端: {name}")
+    return backends[name]()
@@ -0,0 +1,77 @@
+# 网络状态分类: 无链路 / 已连接但未认证 / 在线, 结果短时间缓存并由各模块共享
+import threading
+import time
+
+NO_LINK = "no_link"
+PORTAL = "portal"
+ONLINE = "online"
+
+
+class Classifier:
+    def __init__(self, prober, ttl=2.0, link_prober=None):
+        """
+        :param prober: net.probe.Prober, 返回 True 为在线, False 为被认证页拦截,
+                       None 为全部无法判断
+        :param ttl: 结果缓存时间(秒)
+        :param link_prober: 探测网关等本地地址的 Prober, 外网探测全部无法判断时由它区分
+                            无链路与未认证 (认证前防火墙可能直接丢弃出站流量)
+        """
+        self.prober = prober
+        self.link_prober = link_prober
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+
+    def cached(self):
+        """缓存未过期时返回缓存的状态, 否则返回 None"""
+        if self._result and time.monotonic() - self._result[1] < self.ttl:
+            return self._result[0]
+        return None
+
+    def classify(self):
+        state = self.cached()
+        if state:
+            return state
+        # 同时调用时只有一个线程探测, 其余线程等待并使用它的结果
+        with self._lock:
+            state = self.cached()
+            if state:
+                return state
+            link = None
+            if self.link_prober is not None:
+                # 与外网探测同时进行, 外网探测有结果时不等待
+                link = {}
+                thread = threading.Thread(
+                    target=lambda: link.update(answer=self.link_prober.answer()),
+                    daemon=True)
+                thread.start()
+            answer = self.prober.answer()
+            if answer is None and link is not None:
+                thread.join()
+                if link.get("answer"):
+                    answer = False
+            state = ONLINE if answer else PORTAL if answer is False else NO_LINK
+            self._result = (state, time.monotonic())
+            return state
+
+    def record(self, state):
+        """由其他途径得知的状态 (如认证成功), 直接写入缓存"""
+        self._result = (state, time.monotonic())
+
+    def invalidate(self):
+        self._result = None
+
+
+classifier = None
+
+
+def configure(prober, ttl=2.0, link_prober=None):
+    global classifier
+    classifier = Classifier(prober, ttl, link_prober)
+    return classifier
+
+
+def invalidate():
+    """其他模块的网络请求失败时调用, 下次分类时重新探测"""
+    if classifier is not None:
+        classifier.invalidate()
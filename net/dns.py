@@ -0,0 +1,98 @@
+# 本地DNS缓存: 供共享连接 (net.transport) 与预热使用, 结果按TTL缓存并保存到 state.json
+# 不替换 socket.getaddrinfo, 探测等其他解析不受缓存影响.
+import ipaddress
+import socket
+import threading
+import time
+
+import runner.state
+
+_original = socket.getaddrinfo
+_lock = threading.Lock()
+_cache = {}
+_loaded = False
+_started = time.time()
+ttl = 300           # 解析结果的缓存时间(秒)
+negative_ttl = 5    # 解析失败的缓存时间(秒)
+stale_ttl = 86400   # 解析失败时仍可使用的过期结果的最长时间(秒)
+
+
+def _literal(host):
+    try:
+        ipaddress.ip_address(host.split("%")[0] if isinstance(host, str) else host)
+        return True
+    except ValueError:
+        return False
+
+
+def _key(host, port, family, type, proto, flags):
+    return f"{host}|{port}|{int(family)}|{int(type)}|{proto}|{flags}"
+
+
+def _load():
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        _cache.update(runner.state.get("dns", {}))
+
+
+def _save():
+    # 只保存成功的解析结果
+    runner.state.put("dns", {k: v for k, v in _cache.items() if v[1] is not None})
+
+
+def _result(entry):
+    return [(socket.AddressFamily(f), socket.SocketKind(t), p, c, tuple(a))
+            for f, t, p, c, a in entry[1]]
+
+
+def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    if host is None or _literal(host):
+        return _original(host, port, family, type, proto, flags)
+    key = _key(host, port, family, type, proto, flags)
+    now = time.time()
+    with _lock:
+        _load()
+        entry = _cache.get(key)
+    if entry and now < entry[0]:
+        if entry[1] is None:
+            raise socket.gaierror(socket.EAI_NONAME, "DNS解析失败 (缓存)")
+        return _result(entry)
+    try:
+        result = _original(host, port, family, type, proto, flags)
+    except socket.gaierror:
+        if entry and entry[1] is not None and now - entry[0] < stale_ttl:
+            # 解析失败时使用过期的结果
+            return _result(entry)
+        with _lock:
+            _cache[key] = [now + negative_ttl, None, now]
+        raise
+    with _lock:
+        _cache[key] = [now + ttl, [[int(f), int(t), p, c, list(a)]
+                                   for f, t, p, c, a in result], now]
+        _save()
+    return result
+
+
+def resolve(host, port=443):
+    """预先解析, 结果写入缓存"""
+    return getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+
+def addresses(host, port):
+    """host 的IP地址列表 (使用缓存), host 本身是IP时原样返回"""
+    if _literal(host):
+        return [host]
+    return list(dict.fromkeys(info[4][0] for info in resolve(host, port)))
+
+
+def forget_recent():
+    """认证成功后调用: 丢弃本次运行中 (可能在认证前) 得到的解析结果
+
+    认证前认证页可能劫持DNS, 返回自己的地址.
+    """
+    with _lock:
+        _load()
+        for key in [k for k, v in _cache.items() if len(v) > 2 and v[2] >= _started]:
+            del _cache[key]
+        _save()
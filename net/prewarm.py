@@ -0,0 +1,27 @@
+# 预热: 确认在线后立即解析后续步骤要访问的主机并建立长连接
+import threading
+from urllib.parse import urlsplit
+
+from . import dns
+from .transport import transport
+
+
+def warm(url):
+    parts = urlsplit(url)
+    try:
+        dns.resolve(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        # 任意响应都会在连接池中留下已完成握手的连接
+        transport.head(f"{parts.scheme}://{parts.netloc}/", timeout=5,
+                       allow_redirects=False)
+    except Exception:
+        pass
+
+
+def prewarm(urls):
+    """在后台线程中同时预热所有地址, 返回线程列表"""
+    threads = []
+    for url in dict.fromkeys(u for u in urls if u):
+        thread = threading.Thread(target=warm, args=(url,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
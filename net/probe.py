@@ -0,0 +1,166 @@
+# 多地址竞速探测: 同时探测多个地址, 取第一个确定的结果并取消其余探测
+#
+# 地址格式:
+#   http://host/path|204   HTTP(S)请求, 状态码等于期望值为 True, 否则 False (被认证页拦截)
+#   https://host/path      未指定状态码时收到任意响应即为 True
+#   tcp://host:port        TCP连接成功为 True
+#   dns://host             域名解析成功为 True
+# 连接失败、超时等无法判断的情况不计入结果, 全部无法判断时 Prober.answer() 返回 None
+# (Prober.probe() 返回 False). tcp:// 与 dns:// 只能说明网络已连接, 不能说明已认证,
+# 应放在区分有无链路的探测组中 (见 net/classify.py).
+import http.client
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+import runner.state
+import runner.stats
+
+
+def parse(endpoint):
+    target, _, expect = endpoint.partition("|")
+    parts = urlsplit(target)
+    return parts, int(expect) if expect else None
+
+
+class _Race:
+    """一次竞速: 记录进行中的连接, 结束时关闭以取消其余探测"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._sockets = []
+
+    def track(self, sock):
+        with self._lock:
+            if self.done.is_set():
+                sock.close()
+                raise OSError("探测已取消")
+            self._sockets.append(sock)
+
+    def cancel(self):
+        with self._lock:
+            self.done.set()
+            for sock in self._sockets:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+
+def _probe_http(parts, expect, timeout, race):
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    race.track(sock)
+    if secure:
+        sock = ssl.create_default_context().wrap_socket(
+            sock, server_hostname=parts.hostname)
+        race.track(sock)
+    conn = http.client.HTTPConnection(parts.hostname, port, timeout=timeout)
+    conn.sock = sock
+    try:
+        conn.request("GET", (parts.path or "/") + (
+            "?" + parts.query if parts.query else ""), headers={
+            "Host": parts.netloc, "Connection": "close"})
+        status = conn.getresponse().status
+    finally:
+        conn.close()
+    return True if expect is None else status == expect
+
+
+def _probe_tcp(parts, timeout, race):
+    sock = socket.create_connection((parts.hostname, parts.port), timeout=timeout)
+    race.track(sock)
+    sock.close()
+    return True
+
+
+def probe(endpoint, timeout=3, race=None):
+    """探测单个地址, 返回 True/False, 无法判断时抛出异常"""
+    race = race or _Race()
+    parts, expect = parse(endpoint)
+    if parts.scheme in ["http", "https"]:
+        return _probe_http(parts, expect, timeout, race)
+    if parts.scheme == "tcp":
+        return _probe_tcp(parts, timeout, race)
+    if parts.scheme == "dns":
+        socket.getaddrinfo(parts.hostname, None)
+        return True
+    raise ValueError(f"不支持的探测地址: {endpoint}")
+
+
+class Prober:
+    """同一类探测的一组地址, 按历史延迟排序, 依次错开启动"""
+
+    def __init__(self, name, endpoints, timeout=3, stagger=0.05):
+        """
+        :param name: 统计数据在 state.json 中的键名
+        :param stagger: 相邻两个地址启动的间隔(秒), 较快的地址先启动
+        """
+        self.name = name
+        self.endpoints = list(endpoints)
+        self.timeout = timeout
+        self.stagger = stagger
+        self._lock = threading.Lock()
+        self.stats = runner.state.get(f"probe.{name}", {})
+        self.last = None
+
+    def ranked(self):
+        def score(endpoint):
+            stat = self.stats.get(endpoint)
+            # 没有统计的地址排在有统计的地址之后, 保持配置顺序
+            return stat["latency"] if stat else self.timeout
+        return sorted(self.endpoints, key=score)
+
+    def _record(self, endpoint, latency):
+        with self._lock:
+            stat = self.stats.setdefault(endpoint, {"count": 0})
+            runner.stats.smooth(stat, latency)
+            stat["count"] += 1
+
+    def probe(self):
+        return bool(self.answer())
+
+    def answer(self):
+        """返回第一个确定的结果 True/False, 全部无法判断时返回 None"""
+        race = _Race()
+        result = {}
+        pending = []
+
+        def run(endpoint):
+            start = time.monotonic()
+            try:
+                answer = probe(endpoint, self.timeout, race)
+            except Exception:
+                # 无法判断的地址按超时计入统计, 下次排到后面
+                if not race.done.is_set():
+                    self._record(endpoint, self.timeout)
+                return
+            self._record(endpoint, time.monotonic() - start)
+            with self._lock:
+                if "answer" not in result:
+                    result["answer"] = answer
+                    result["endpoint"] = endpoint
+            race.cancel()
+
+        for endpoint in self.ranked():
+            thread = threading.Thread(target=run, args=(endpoint,), daemon=True)
+            thread.start()
+            pending.append(thread)
+            if race.done.wait(self.stagger):
+                break
+        deadline = time.monotonic() + self.timeout
+        while not race.done.is_set() and time.monotonic() < deadline:
+            if not any(thread.is_alive() for thread in pending):
+                break
+            race.done.wait(0.02)
+        race.cancel()
+        with self._lock:
+            # 较慢的探测线程此时可能仍在更新统计
+            stats = {endpoint: dict(stat) for endpoint, stat in self.stats.items()}
+        runner.state.put(f"probe.{self.name}", stats)
+        self.last = result.get("endpoint")
+        return result.get("answer")
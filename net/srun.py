@@ -0,0 +1,226 @@
+# 深澜(SRUN)认证客户端: get_challenge / login / logout / rad_user_info
+import hashlib
+import hmac
+import json
+import math
+import threading
+import time
+
+ALPHABET = "LVoJPiCN2R8G90yg+hmFHuacZ1OWMnrsSTXkYpUq/3dlbfKwv6xztjI7DeBE45QA"
+ENC_VER = "srun_bx1"
+N = "200"
+TYPE = "1"
+
+
+class SrunError(Exception):
+    pass
+
+
+# {{{ 加密 (与认证页 jquery.srun.portal.js 一致)
+
+def _words(msg, include_length):
+    codes = [ord(c) for c in msg]
+    codes += [0] * (-len(codes) % 4)
+    words = [codes[i] | codes[i + 1] << 8 | codes[i + 2] << 16 | codes[i + 3] << 24
+             for i in range(0, len(codes), 4)]
+    if include_length:
+        words.append(len(msg))
+    return words
+
+
+def _chars(words):
+    return "".join(chr(w & 0xff) + chr(w >> 8 & 0xff) + chr(w >> 16 & 0xff) +
+                   chr(w >> 24 & 0xff) for w in words)
+
+
+def xencode(msg, key):
+    if not msg:
+        return ""
+    v = _words(msg, True)
+    k = _words(key, False)
+    k += [0] * (4 - len(k))
+    n = len(v) - 1
+    z = v[n]
+    delta = 0x9E3779B9
+    d = 0
+    for _ in range(math.floor(6 + 52 / (n + 1))):
+        d = (d + delta) & 0xFFFFFFFF
+        e = d >> 2 & 3
+        for p in range(n + 1):
+            y = v[p + 1] if p < n else v[0]
+            m = (z >> 5 ^ y << 2) + ((y >> 3 ^ z << 4) ^ (d ^ y)) + (k[(p & 3) ^ e] ^ z)
+            # 认证页对最后一个字使用 (0xBB390742 | 0x40C6F8BD) 即 0xFBFFFFFF
+            v[p] = (v[p] + m) & (0xFFFFFFFF if p < n else 0xFBFFFFFF)
+            z = v[p]
+    return _chars(v)
+
+
+def b64encode(text):
+    data = [ord(c) for c in text]
+    out = []
+    for i in range(0, len(data), 3):
+        chunk = data[i:i + 3]
+        value = chunk[0] << 16 | (chunk[1] if len(chunk) > 1 else 0) << 8 | \
+            (chunk[2] if len(chunk) > 2 else 0)
+        out.append(ALPHABET[value >> 18 & 63] + ALPHABET[value >> 12 & 63])
+        out.append(ALPHABET[value >> 6 & 63] if len(chunk) > 1 else "=")
+        out.append(ALPHABET[value & 63] if len(chunk) > 2 else "=")
+    return "".join(out)
+
+# }}}
+
+
+def parse_jsonp(text):
+    start = text.find("(")
+    end = text.rfind(")")
+    if start == -1 or end == -1:
+        return json.loads(text)
+    return json.loads(text[start + 1:end])
+
+
+def login_params(username, password, ac_id, ip, token):
+    info = "{SRBX1}" + b64encode(xencode(json.dumps({
+        "username": username,
+        "password": password,
+        "ip": ip,
+        "acid": ac_id,
+        "enc_ver": ENC_VER,
+    }, separators=(",", ":")), token))
+    hmd5 = hmac.new(token.encode(), password.encode(), hashlib.md5).hexdigest()
+    chksum = hashlib.sha1("".join(
+        token + value for value in [username, hmd5, ac_id, ip, N, TYPE, info]
+    ).encode()).hexdigest()
+    return {
+        "action": "login",
+        "username": username,
+        "password": "{MD5}" + hmd5,
+        "ac_id": ac_id,
+        "ip": ip,
+        "chksum": chksum,
+        "info": info,
+        "n": N,
+        "type": TYPE,
+        "os": "Windows 10",
+        "name": "Windows",
+        "double_stack": "0",
+    }
+
+
+def login_ok(res):
+    return res.get("error") == "ok" or res.get("suc_msg") in [
+        "login_ok", "ip_already_online_error"] or \
+        res.get("error") == "ip_already_online_error"
+
+
+class SrunClient:
+    def __init__(self, url, username, password, ac_id="1", ip=None,
+                 token_ttl=30, timeout=5, session=None):
+        """
+        :param url: 认证页地址, 如 http://10.0.0.55
+        :param ip: 本机IP, 默认使用认证服务器看到的地址
+        :param token_ttl: challenge 的缓存时间(秒)
+        """
+        self.base_url = url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.ac_id = str(ac_id)
+        self.ip = ip
+        self.token_ttl = token_ttl
+        self.timeout = timeout
+        self._session = session
+        self._token = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _get(self, path, params):
+        params = dict(params, callback="jQuery", _=int(time.time() * 1000))
+        response = self.session.get(self.base_url + path, params=params,
+                                    timeout=self.timeout)
+        if response.status_code != 200:
+            raise SrunError(f"认证服务器返回 {response.status_code}")
+        return parse_jsonp(response.text)
+
+    def challenge(self, refresh=False):
+        """返回 (token, ip), token 在 token_ttl 内复用"""
+        with self._lock:
+            if not refresh and self._token and \
+                    time.monotonic() - self._token[2] < self.token_ttl:
+                return self._token[0], self._token[1]
+            res = self._get("/cgi-bin/get_challenge",
+                            {"username": self.username, "ip": self.ip or ""})
+            if "challenge" not in res:
+                raise SrunError(f"获取challenge失败: {res.get('error')}")
+            self._token = (res["challenge"], self.ip or res.get("client_ip", ""),
+                           time.monotonic())
+            return self._token[0], self._token[1]
+
+    def login(self):
+        token, ip = self.challenge()
+        res = self._get("/cgi-bin/srun_portal", login_params(
+            self.username, self.password, self.ac_id, ip, token))
+        if not login_ok(res) and res.get("error") in [
+                "challenge_expire_error", "sign_error"]:
+            # 缓存的 challenge 已失效, 重新获取一次
+            token, ip = self.challenge(refresh=True)
+            res = self._get("/cgi-bin/srun_portal", login_params(
+                self.username, self.password, self.ac_id, ip, token))
+        if not login_ok(res):
+            raise SrunError(
+                f"登录失败: {res.get('error_msg') or res.get('error')}")
+        return True
+
+    async def _get_async(self, path, params):
+        import net.ahttp
+
+        params = dict(params, callback="jQuery", _=int(time.time() * 1000))
+        response = await net.ahttp.get(self.base_url + path, params=params,
+                                       timeout=self.timeout)
+        if response.status_code != 200:
+            raise SrunError(f"认证服务器返回 {response.status_code}")
+        return parse_jsonp(response.text)
+
+    async def challenge_async(self, refresh=False):
+        """challenge 的协程版本, 与同步版本共用缓存的 token"""
+        token = self._token
+        if not refresh and token and time.monotonic() - token[2] < self.token_ttl:
+            return token[0], token[1]
+        res = await self._get_async("/cgi-bin/get_challenge",
+                                    {"username": self.username, "ip": self.ip or ""})
+        if "challenge" not in res:
+            raise SrunError(f"获取challenge失败: {res.get('error')}")
+        self._token = (res["challenge"], self.ip or res.get("client_ip", ""),
+                       time.monotonic())
+        return self._token[0], self._token[1]
+
+    async def login_async(self):
+        """login 的协程版本: 请求在事件循环中进行, 取消时立即中止"""
+        token, ip = await self.challenge_async()
+        res = await self._get_async("/cgi-bin/srun_portal", login_params(
+            self.username, self.password, self.ac_id, ip, token))
+        if not login_ok(res) and res.get("error") in [
+                "challenge_expire_error", "sign_error"]:
+            token, ip = await self.challenge_async(refresh=True)
+            res = await self._get_async("/cgi-bin/srun_portal", login_params(
+                self.username, self.password, self.ac_id, ip, token))
+        if not login_ok(res):
+            raise SrunError(
+                f"登录失败: {res.get('error_msg') or res.get('error')}")
+        return True
+
+    def logout(self):
+        _, ip = self.challenge()
+        res = self._get("/cgi-bin/srun_portal", {
+            "action": "logout", "username": self.username,
+            "ac_id": self.ac_id, "ip": ip})
+        return res.get("error") == "ok"
+
+    def status(self):
+        """在线时返回用户信息, 否则返回 None"""
+        res = self._get("/cgi-bin/rad_user_info", {})
+        return res if res.get("error") == "ok" else None
@@ -0,0 +1,129 @@
+# 共享HTTP连接: 每个主机一个长连接池, 统一的默认超时与连接统计
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import dns
+
+
+class _CachedDNS:
+    """连接前通过 net.dns 的缓存解析主机名, 依次尝试各个地址"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            candidates = dns.addresses(host, self.port)
+        except OSError:
+            # 交给 urllib3 解析, 由它抛出统一的异常
+            return super()._new_conn()
+        if not candidates:
+            return super()._new_conn()
+        try:
+            for address in candidates[:-1]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    pass
+            self._dns_host = candidates[-1]
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+
+class _HTTPConnection(_CachedDNS, HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_CachedDNS, HTTPSConnection):
+    pass
+
+
+class _HTTPPool(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+
+class _HTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+
+class _Adapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+
+
+class Transport:
+    def __init__(self, timeout=5, pool_connections=8, pool_maxsize=8):
+        """
+        :param timeout: 未指定 timeout 的请求使用的超时(秒)
+        :param pool_connections: 缓存连接池的主机数
+        :param pool_maxsize: 每个主机保持的长连接数
+        """
+        self.timeout = timeout
+        self.adapter = _Adapter(pool_connections=pool_connections,
+                                pool_maxsize=pool_maxsize)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.session = self.new_session()
+
+    def new_session(self):
+        """与共享会话使用同一个连接池, Cookie 各自独立 (供 IKuaiClient 等需要登录状态的客户端使用)"""
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        session.request = self._wrap(session.request)
+        return session
+
+    def _wrap(self, request):
+        def wrapped(method, url, **kwargs):
+            kwargs.setdefault("timeout", self.timeout)
+            host = urlsplit(url).netloc
+            start = time.monotonic()
+            try:
+                response = request(method, url, **kwargs)
+            except requests.RequestException:
+                self._record(host, time.monotonic() - start, error=True)
+                raise
+            self._record(host, time.monotonic() - start)
+            return response
+        return wrapped
+
+    def _record(self, host, elapsed, error=False):
+        with self._lock:
+            stat = self._stats.setdefault(
+                host, {"requests": 0, "errors": 0, "time": 0.0})
+            stat["requests"] += 1
+            stat["errors"] += error
+            stat["time"] += elapsed
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    def metrics(self):
+        """每个主机的请求数、失败数、总耗时与新建连接数"""
+        with self._lock:
+            result = {host: dict(stat) for host, stat in self._stats.items()}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in [None, 80, 443] else f"{pool.host}:{pool.port}"
+            stat = result.setdefault(host, {"requests": 0, "errors": 0, "time": 0.0})
+            stat["connections"] = stat.get("connections", 0) + pool.num_connections
+        return result
+
+
+transport = Transport()
@@ -0,0 +1,117 @@
+# Wake-on-LAN: 本机直接发送魔术包, 一次构造多个MAC的数据包并经所有网卡重复广播
+import ipaddress
+import re
+import socket
+import subprocess
+import sys
+import time
+
+PORTS = (9, 7)
+
+
+def parse_mac(mac):
+    digits = re.sub(r"[^0-9a-fA-F]", "", mac)
+    if len(digits) != 12:
+        raise ValueError(f"MAC地址格式错误: {mac}")
+    return bytes.fromhex(digits)
+
+
+def parse_password(password):
+    """SecureOn 密码: 6字节 (写作MAC形式) 或 4字节 (写作IPv4形式)"""
+    if password is None:
+        return b""
+    if isinstance(password, bytes):
+        if len(password) not in (4, 6):
+            raise ValueError("SecureOn 密码应为4或6字节")
+        return password
+    if re.fullmatch(r"\d+\.\d+\.\d+\.\d+", password):
+        return ipaddress.IPv4Address(password).packed
+    return parse_mac(password)
+
+
+def magic_packet(mac, password=None):
+    return b"\xff" * 6 + parse_mac(mac) * 16 + parse_password(password)
+
+
+def _linux_interfaces():
+    output = subprocess.run(["ip", "-o", "-4", "addr", "show"], capture_output=True,
+                            text=True, timeout=2).stdout
+    interfaces = []
+    for match in re.finditer(r"inet (\d+\.\d+\.\d+\.\d+)/(\d+)(?: brd (\d+\.\d+\.\d+\.\d+))?", output):
+        address, _, broadcast = match.groups()
+        if broadcast is None:
+            # 点对点或回环接口, 无法广播
+            continue
+        interfaces.append((address, broadcast))
+    return interfaces
+
+
+def _host_interfaces():
+    addresses = {info[4][0] for info in socket.getaddrinfo(
+        socket.gethostname(), None, socket.AF_INET)}
+    interfaces = []
+    for address in sorted(addresses):
+        if address.startswith(("127.", "169.254.")):
+            continue
+        # 无法取得掩码时按 /24 估算定向广播地址
+        network = ipaddress.IPv4Network(f"{address}/24", strict=False)
+        interfaces.append((address, str(network.broadcast_address)))
+    return interfaces
+
+
+def interfaces():
+    """可广播的网卡: [(本机地址, 定向广播地址)]"""
+    try:
+        if sys.platform.startswith("linux"):
+            return _linux_interfaces()
+        return _host_interfaces()
+    except (OSError, subprocess.SubprocessError):
+        return []
+
+
+def send(macs, password=None, broadcasts=(), ports=PORTS, bursts=3, interval=0.05):
+    """向所有网卡的受限广播与定向广播地址重复发送魔术包, 返回发出的数据包数
+
+    :param macs: 一个或多个MAC地址, 所有数据包预先构造好
+    :param broadcasts: 额外的定向广播地址 (如工作站所在的其他网段)
+    :param bursts: 重复发送的轮数, 每轮间隔 interval 秒, 降低无线网络丢包的影响
+    """
+    if isinstance(macs, str):
+        macs = [macs]
+    packets = [magic_packet(mac, password) for mac in macs]
+    targets = {}
+    for address, broadcast in interfaces() or [(None, None)]:
+        destinations = ["255.255.255.255"] + ([broadcast] if broadcast else [])
+        targets[address] = list(dict.fromkeys(destinations + list(broadcasts)))
+    sockets = []
+    try:
+        for address, destinations in targets.items():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            try:
+                if address:
+                    # 绑定网卡地址, 受限广播才会从这块网卡发出
+                    sock.bind((address, 0))
+            except OSError:
+                sock.close()
+                continue
+            sockets.append((sock, destinations))
+        sent = 0
+        for burst in range(bursts):
+            if burst:
+                time.sleep(interval)
+            for sock, destinations in sockets:
+                for destination in destinations:
+                    for port in ports:
+                        for packet in packets:
+                            try:
+                                sock.sendto(packet, (destination, port))
+                                sent += 1
+                            except OSError:
+                                pass
+    finally:
+        for sock, _ in sockets:
+            sock.close()
+    if not sent:
+        raise OSError("没有可用于发送魔术包的网卡")
+    return sent
@@ -1,24 +1,239 @@
 import requests
 import settings 
-import os
+import threading
+import runner.state
+import net.classify
+import net.transport
+import remote.target
+import remote.link
+import remote.launcher
+import remote.resolver
+from runner.console import print
 
-def getip():
+def _from_ip_url():
+    try:
+        answer=net.transport.transport.get(settings.ip_url,timeout=getattr(settings,"ip_timeout",5)).json()
+    except requests.RequestException:
+        net.classify.invalidate()
+        raise
+    if isinstance(answer,dict):
+        # ip_url 可能报告工作站所有网卡的地址, 与 iKuai 来源一样只保留私有局域网地址
+        answer["lan"]=remote.resolver.lan(answer.get("lan"))
+    return answer
+
+def _from_ikuai():
+    import procedure.workstation
+    client=procedure.workstation.get_ikuai()
+    lan=[]
+    mac=getattr(settings,"wake_mac",None)
+    if mac:
+        # 终端监控中与工作站MAC相同的条目即为其局域网地址
+        for device in client.iter_monitor_lanip():
+            if device.get("mac","").lower()==mac.lower():
+                lan.append(device["ip_addr"])
+    return {"wan":client.list_vwanips(),"lan":remote.resolver.lan(lan)}
+
+def get_resolver():
+    global resolver
+    if resolver is None:
+        sources=[]
+        if getattr(settings,"ip_url",None):
+            sources.append(remote.resolver.Source("ip_url",_from_ip_url))
+        if getattr(settings,"ikuai_url",None):
+            sources.append(remote.resolver.Source("ikuai",_from_ikuai))
+        resolver=remote.resolver.Resolver(
+            sources,
+            ttl=getattr(settings,"ip_ttl",60),
+            timeout=getattr(settings,"ip_timeout",5)
+        )
+    return resolver
+
+def fetch_ips(refresh=False):
+    """同时查询所有IP来源, 采用第一个一致的结果"""
     global ips
-    ips=requests.get(settings.ip_url).json()
-    if not ips:
-        raise Exception("无法获取IP")
+    ips=get_resolver().resolve(refresh)
+    runner.state.put("wan_ip",ips["wan"][0])
+    runner.state.put("lan_ips",ips["lan"])
     return ips["wan"][0]
 
+def candidates(default=None):
+    """候选RDP地址: 已获取的局域网与广域网IP, 尚未获取时使用上次记录的地址"""
+    if ips:
+        return remote.target.candidates(ips.get("lan"),ips["wan"])
+    return remote.target.candidates(runner.state.get("lan_ips",[]),[default])
+
+def _picked(default,picked):
+    if picked is None:
+        # 都不可达时仍使用广域网IP, 由远程桌面客户端自行重试
+        return default
+    address,kind,rtt=picked
+    runner.state.put("rdp_target",{"address":address,"kind":kind,"rtt":rtt})
+    return address
+
+def select_target(default):
+    """同时探测所有候选地址, 返回可用的局域网地址或握手最快的地址"""
+    return _picked(default,remote.target.select(
+        candidates(default),settings.rdp_port,timeout=getattr(settings,"target_timeout",1)))
+
+def verify():
+    """后台确认缓存的IP是否仍然正确"""
+    global verified
+    try:
+        verified=fetch_ips()
+    except Exception:
+        verified=None
+    finally:
+        verify_done.set()
+
+def getip():
+    global guess
+    cached=runner.state.get("wan_ip")
+    if cached:
+        # 先使用上次的IP, 同时在后台确认
+        guess=cached
+        verify_done.clear()
+        threading.Thread(target=verify,daemon=True).start()
+        return f"{cached} (缓存)"
+    guess=None
+    return fetch_ips()
+
+def chosen_workstation():
+    """多台工作站时由 workstation.poweron 选出的工作站"""
+    import sys
+    workstation=sys.modules.get("procedure.workstation")
+    if workstation and workstation.chosen and workstation.chosen.get("address"):
+        return workstation.chosen
+    return None
+
+def link_quality(ip,port=None):
+    """到目标的链路质量, settings.link_ttl 秒内复用上次的测量结果"""
+    key=f"link.{ip}"
+    cached=runner.state.get(key,max_age=getattr(settings,"link_ttl",600))
+    if cached:
+        return remote.link.LinkQuality.from_dict(cached)
+    url=getattr(settings,"throughput_url",None)
+    # select_target 刚测得的握手耗时作为第一个样本
+    target=runner.state.get("rdp_target",max_age=60)
+    quality=remote.link.measure(
+        ip,port or settings.rdp_port,
+        samples=getattr(settings,"link_samples",5),
+        throughput_probe=(lambda: remote.link.throughput(net.transport.transport,url)) if url else None,
+        known_rtt=target["rtt"] if target and target["address"]==ip else None
+    )
+    if quality.rtt is not None:
+        # 全部失败 (如缓存的IP已失效) 时不缓存, 以免在 link_ttl 内一直使用精简的会话
+        runner.state.put(key,quality.as_dict())
+    return quality
+
+def tier(ip,port=None):
+    # settings.rdp_tier 可固定使用某一档
+    return getattr(settings,"rdp_tier",None) or link_quality(ip,port).tier()
+
+def write_profile(ip,port=None,tier_name=None):
+    port=port or settings.rdp_port
+    f=open(settings.rdp_temp_file,"w")
+    f.write(remote.link.render(settings.rdp_file,f"{ip}:{port}",tier_name or tier(ip,port)))
+    f.close()
+
+def get_launcher():
+    global launcher
+    if launcher is None:
+        # settings.rdp_client: mstsc / xfreerdp, 默认按平台选择
+        launcher=remote.launcher.default(getattr(settings,"rdp_client",None),
+                                         getattr(settings,"rdp_client_args",()))
+    return launcher
+
+def prepare(ip,port):
+    tier_name=tier(ip,port)
+    write_profile(ip,port,tier_name)
+    return settings.rdp_temp_file,tier_name
+
+def new_session():
+    global session
+    session=remote.launcher.Session(
+        get_launcher(),prepare,
+        max_restarts=getattr(settings,"rdp_max_restarts",5),
+        watch_interval=getattr(settings,"rdp_watch_interval",15),
+        stable_after=getattr(settings,"rdp_stable_after",5),
+        on_reconnect=lambda message: print("    [yellow]"+message+"[/yellow]")
+    )
+    return session
+
 def connect():
-    if not ips:
-        ip=getip()
-    else:
+    session=new_session()
+    chosen=chosen_workstation()
+    if chosen:
+        session.start(chosen["address"],chosen.get("port") or settings.rdp_port)
+        return session.wait()
+    if guess:
+        ip=guess
+    elif ips:
         ip=ips["wan"][0]
+    else:
+        ip=fetch_ips()
+    ip=select_target(ip)
     # os.system(f"mstsc /v:{ip}:{settings.rdp_port} /f")
-    f=open(settings.rdp_temp_file,"w")
-    f.write(settings.rdp_file.replace("$$address$$",f"{ip}:{settings.rdp_port}"))
-    f.close()
-    os.system("mstsc ./temp.rdp")
-    return True
-    
-ips=[]
\ No newline at end of file
+    session.start(ip,settings.rdp_port)
+    if guess:
+        verify_done.wait()
+        if verified and verified!=guess:
+            # 缓存的IP已失效, 使用新IP重新连接
+            correct=select_target(verified)
+            if correct!=ip:
+                session.switch(correct,settings.rdp_port)
+    return session.wait()
+
+async def fetch_ips_async():
+    import asyncio
+    return await asyncio.to_thread(fetch_ips)
+
+async def select_target_async(default):
+    return _picked(default,await remote.target.select_async(
+        candidates(default),settings.rdp_port,timeout=getattr(settings,"target_timeout",1)))
+
+async def getip_async():
+    import asyncio
+    global guess,verify_task
+    cached=runner.state.get("wan_ip")
+    if cached:
+        guess=cached
+        verify_task=asyncio.ensure_future(fetch_ips_async())
+        return f"{cached} (缓存)"
+    guess=None
+    return await fetch_ips_async()
+
+async def connect_async():
+    import asyncio
+    session=new_session()
+    chosen=chosen_workstation()
+    if chosen:
+        await asyncio.to_thread(session.start,chosen["address"],chosen.get("port") or settings.rdp_port)
+        return await asyncio.to_thread(session.wait)
+    if guess:
+        ip=guess
+    elif ips:
+        ip=ips["wan"][0]
+    else:
+        ip=await fetch_ips_async()
+    ip=await select_target_async(ip)
+    await asyncio.to_thread(session.start,ip,settings.rdp_port)
+    if guess and verify_task:
+        try:
+            correct=await verify_task
+        except Exception:
+            correct=None
+        if correct and correct!=guess:
+            correct=await select_target_async(correct)
+            if correct!=ip:
+                await asyncio.to_thread(session.switch,correct,settings.rdp_port)
+    # 会话监督阻塞等待进程, 放到线程中执行
+    return await asyncio.to_thread(session.wait)
+
+ips=[]
+guess=None
+verified=None
+verify_done=threading.Event()
+verify_task=None
+launcher=None
+resolver=None
+session=None
@@ -1,30 +1,187 @@
 import os
+import sys
 import time
 import settings
-import requests
+import runner.state
+import net.probe
+import net.classify
+import net.backend
+import net.srun
+
+# 认证网关与外网探测地址, 可在settings中覆盖 (测试环境使用本地服务)
+portal_host=getattr(settings,"portal_host","10.0.0.55")
+portal_port=getattr(settings,"portal_port",80)
+online_url=getattr(settings,"online_url","https://www.bing.com")
+
+# 竞速探测的地址, 格式见 net/probe.py
+online_probes=getattr(settings,"online_probes",[
+    "http://connect.rom.miui.com/generate_204|204",
+    "http://www.qualcomm.cn/generate_204|204",
+    online_url
+])
+# 外网探测全部无响应时, 网关可达或域名可以解析说明已连接但未认证
+link_probes=getattr(settings,"link_probes",[
+    f"tcp://{portal_host}:{portal_port}",
+    "dns://connect.rom.miui.com"
+])
+online_prober=net.probe.Prober("online",online_probes,timeout=5)
+link_prober=net.probe.Prober("link",link_probes,timeout=2)
+classifier=net.classify.configure(online_prober,ttl=getattr(settings,"network_ttl",2),
+                                  link_prober=link_prober)
+
+def prewarm():
+    """确认在线后预热后续步骤要访问的主机, 每次运行只执行一次"""
+    global prewarmed
+    if prewarmed:
+        return
+    prewarmed=True
+    import net.prewarm
+    net.prewarm.prewarm([
+        getattr(settings,"wake_url","https://songguoyun.topwd.top"),
+        getattr(settings,"ip_url",None),
+        getattr(settings,"ikuai_url",None)
+    ])
 
 def check():
-    try:
-        requests.get("http://10.0.0.55",timeout=2)
-        return True
-    except:
-        return False
+    state=classifier.classify()
+    if state==net.classify.ONLINE:
+        prewarm()
+    return state!=net.classify.NO_LINK
 
 def check_login():
-    try:
-        requests.get("https://www.bing.com",timeout=5)
+    if classifier.classify()==net.classify.ONLINE:
+        prewarm()
         return True
-    except Exception as e:
-        return False
+    return False
     
+def get_backend():
+    global backend
+    if backend is None:
+        backend=net.backend.default(getattr(settings,"network_backend",None),portal_host)
+    return backend
+
 def connect():
     if not check():
-        os.system(f"netsh wlan connect name={settings.WIFI_SSID}")
+        # 等待获得地址的事件, 而不是在关联过程中反复探测
+        # 前后两次 check 最多各约7s, procedure.json 中该步骤的单次超时须大于 link_timeout 加上探测时间
+        get_backend().connect(settings.WIFI_SSID)
+        if not get_backend().wait_address(timeout=getattr(settings,"link_timeout",15)):
+            return False
+        classifier.invalidate()
         return check()
     return True
 
+def forget_dns():
+    # 认证前的解析结果可能被认证页劫持, 登录后丢弃
+    if "net.dns" in sys.modules:
+        sys.modules["net.dns"].forget_recent()
+
+def get_srun():
+    """配置了账号时使用内置的SRUN客户端, 否则使用 settings.SRUN_CMD"""
+    global srun
+    if srun is None and getattr(settings,"srun_username",None):
+        import net.transport
+        srun=net.srun.SrunClient(
+            getattr(settings,"srun_url",f"http://{portal_host}:{portal_port}"),
+            settings.srun_username,
+            settings.srun_password,
+            ac_id=getattr(settings,"srun_ac_id","1"),
+            session=net.transport.transport.session
+        )
+    return srun
+
+def _check_first():
+    """登录前是否先检查在线状态
+
+    分类结果已缓存 (通常是 connect 步骤刚得到的) 或近期登录过 (多半仍在线) 时先检查;
+    否则内置客户端直接登录, 已在线时认证服务器返回 ip_already_online_error, 同样视为成功,
+    省去一轮探测. 外部命令 SRUN_CMD 开销大, 总是先检查.
+    """
+    if classifier.cached() or not get_srun():
+        return True
+    return runner.state.get("login_time",max_age=getattr(settings,"login_ttl",6*3600)) is not None
+
 def login():
-    if not check_login():
-        os.popen(settings.SRUN_CMD).read()
-        return check_login()
+    if _check_first() and check_login():
+        return True
+    if get_srun():
+        # 认证服务器的响应已说明登录结果, 不再额外探测
+        try:
+            get_srun().login()
+        except Exception:
+            # 未经检查直接登录失败时, 可能本就不需要认证
+            if check_login():
+                return True
+            raise
+        runner.state.put("login_time",time.time())
+        forget_dns()
+        classifier.record(net.classify.ONLINE)
+        prewarm()
+        return True
+    os.popen(settings.SRUN_CMD).read()
+    classifier.invalidate()
+    if check_login():
+        runner.state.put("login_time",time.time())
+        forget_dns()
+        return True
+    return False
+
+async def _shell(cmd):
+    import asyncio
+    proc=await asyncio.create_subprocess_shell(cmd,stdout=asyncio.subprocess.PIPE)
+    try:
+        await proc.communicate()
+    except asyncio.CancelledError:
+        proc.kill()
+        raise
+
+async def check_async():
+    import asyncio
+    if classifier.cached():
+        return classifier.cached()!=net.classify.NO_LINK
+    # 与 check 使用同一个分类结果; 探测在线程中进行, 步骤超时只放弃等待,
+    # 探测本身由各自的超时结束
+    return await asyncio.to_thread(check)
+
+async def check_login_async():
+    import asyncio
+    if classifier.cached():
+        return classifier.cached()==net.classify.ONLINE
+    # 认证页的302等响应不代表在线, 与 check_login 使用同一组探测及其期望状态码
+    return await asyncio.to_thread(check_login)
+
+async def connect_async():
+    import asyncio
+    if not await check_async():
+        await asyncio.to_thread(get_backend().connect,settings.WIFI_SSID)
+        if not await get_backend().wait_address_async(timeout=getattr(settings,"link_timeout",15)):
+            return False
+        classifier.invalidate()
+        return await check_async()
     return True
+
+async def login_async():
+    if _check_first() and await check_login_async():
+        return True
+    if get_srun():
+        try:
+            await get_srun().login_async()
+        except Exception:
+            if await check_login_async():
+                return True
+            raise
+        runner.state.put("login_time",time.time())
+        forget_dns()
+        classifier.record(net.classify.ONLINE)
+        return True
+    await _shell(settings.SRUN_CMD)
+    classifier.invalidate()
+    if await check_login_async():
+        runner.state.put("login_time",time.time())
+        forget_dns()
+        return True
+    return False
+
+backend=None
+srun=None
+prewarmed=False
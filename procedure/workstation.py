@@ -6,80 +6,374 @@ import json
 import socket
 import time
 import struct
+import threading
 import ikuai.core
+import remote.ready
+import remote.fleet
+import remote.boot_model
+import remote.wake
+import net.ahttp
+import net.classify
+import net.transport
+import net.wol
+import runner.state
 
 
-def list_devices():
-    res=requests.post("https://songguoyun.topwd.top/Esp_Api_advance.php",json={
+wake_url=getattr(settings,"wake_url","https://songguoyun.topwd.top")
+
+power_values={
+    True:1,
+    False:0,
+    0:0,
+    -1:0,
+    1:1,
+    "shutdown":0,
+    "boot":1,
+    "start":1,
+    "poweron":1,
+    "reboot":2,
+    "restart":2,
+    "force_restart":2,
+    "poweroff":14,
+    "force_shutdown":14
+}
+
+def _list_devices_payload():
+    return {
         "sgdz_account": settings.wake_username,
         "sgdz_password": settings.wake_password,
         "type": 1
-    },timeout=2).text
-    return json.loads(unquote(res))['deviceslist']
-
-def set_power(name,state):
-    """控制电源状态(True:开机,False:关机,reboot:强制重启,force_shutdown:强制关机)
-    """
-    map={
-        True:1,
-        False:0,
-        0:0,
-        -1:0,
-        1:1,
-        "shutdown":0,
-        "boot":1,
-        "start":1,
-        "poweron":1,
-        "reboot":2,
-        "restart":2,
-        "force_restart":2,
-        "poweroff":14,
-        "force_shutdown":14
     }
-    res=requests.post("https://songguoyun.topwd.top/Esp_Api_new.php",json={
+
+def _set_power_payload(name,state):
+    return {
         "sgdz_account": settings.wake_username,
         "sgdz_password": settings.wake_password,
         "device_name":name,
-        "value": map[state]
-    },timeout=2).text
-    if int(json.loads(unquote(res))["status"]) in [0,-1]:
-        return True
-    return False
+        "value": power_values[state]
+    }
 
-def check():
-    res=int(list_devices()[0]["status"])
+def _parse_devices(res):
+    devices=json.loads(unquote(res))['deviceslist']
+    if devices:
+        device={
+            "name":devices[0]["deviceName"],
+            "status":int(devices[0]["status"])
+        }
+        if runner.state.get("device")!=device:
+            runner.state.put("device",device)
+    return devices
+
+def _parse_power(res):
+    return int(json.loads(unquote(res))["status"]) in [0,-1]
+
+def _check_status(devices):
+    res=int(devices[0]["status"])
     if res==2:
         raise Exception("设备离线,等待设备上线...")
     return res==1
 
+def _post(url,payload):
+    try:
+        return net.transport.transport.post(url,json=payload,timeout=2).text
+    except requests.RequestException:
+        # 请求失败可能是网络状态变化, 让下次检查重新探测
+        net.classify.invalidate()
+        raise
+
+class DeviceRegistry:
+    """设备列表缓存: 结果保留ttl秒, 同时发起的查询合并为一次云端请求"""
+
+    def __init__(self,ttl=2.0):
+        self.ttl=ttl
+        self._cond=threading.Condition()
+        self._devices=None
+        self._time=0
+        self._loading=False
+        self._task=None
+        self._task_generation=0
+        # invalidate() 时递增, 在此之前发起的查询结果不再写入缓存
+        self._generation=0
+
+    def _fresh(self):
+        return self._devices is not None and time.monotonic()-self._time<self.ttl
+
+    def _store(self,devices,generation):
+        if generation!=self._generation:
+            return
+        self._devices=devices
+        self._time=time.monotonic()
+
+    def get(self,fetch):
+        with self._cond:
+            while True:
+                if self._fresh():
+                    return self._devices
+                if not self._loading:
+                    self._loading=True
+                    generation=self._generation
+                    break
+                # 其他线程正在查询, 等待其结果
+                self._cond.wait()
+                if not self._fresh():
+                    # 查询失败, 由本线程重试
+                    continue
+        try:
+            devices=fetch()
+            with self._cond:
+                self._store(devices,generation)
+            return devices
+        finally:
+            with self._cond:
+                self._loading=False
+                self._cond.notify_all()
+
+    async def get_async(self,fetch):
+        import asyncio
+        if self._fresh():
+            return self._devices
+        # invalidate() 之后不再等待之前发起的查询
+        if self._task is None or self._task.done() or self._task_generation!=self._generation:
+            generation=self._task_generation=self._generation
+            def done(task):
+                if not task.cancelled() and task.exception() is None:
+                    with self._cond:
+                        self._store(task.result(),generation)
+            self._task=asyncio.ensure_future(fetch())
+            self._task.add_done_callback(done)
+        return await asyncio.shield(self._task)
+
+    def invalidate(self):
+        with self._cond:
+            self._devices=None
+            self._generation+=1
+
+registry=DeviceRegistry(ttl=getattr(settings,"device_ttl",2))
+
+def _fetch_devices():
+    return _parse_devices(_post(f"{wake_url}/Esp_Api_advance.php",_list_devices_payload()))
+
+def list_devices():
+    return registry.get(_fetch_devices)
+
+def set_power(name,state):
+    """控制电源状态(True:开机,False:关机,reboot:强制重启,force_shutdown:强制关机)
+    """
+    try:
+        return _parse_power(_post(f"{wake_url}/Esp_Api_new.php",_set_power_payload(name,state)))
+    finally:
+        # 电源状态即将变化, 缓存的设备列表作废
+        registry.invalidate()
+
+def _find_device(devices,name):
+    for device in devices:
+        if device["deviceName"]==name:
+            return [device]
+    raise Exception(f"云端没有名为 {name} 的设备")
+
+def check():
+    if chosen:
+        return _check_status(_find_device(list_devices(),chosen["name"]))
+    return _check_status(list_devices())
+
+def rdp_addresses():
+    """用于探测就绪的RDP地址: 优先使用配置, 否则使用rdp步骤已获取的IP"""
+    host=getattr(settings,"rdp_host",None)
+    if host:
+        return [host]
+    import procedure.rdp
+    if procedure.rdp.ips:
+        return procedure.rdp.ips["wan"][:1]
+    cached=runner.state.get("wan_ip")
+    return [cached] if cached else []
+
+def device_name():
+    # 上次运行已记录设备名称, 省去一次云端请求
+    device=runner.state.get("device")
+    if device:
+        return device["name"]
+    return list_devices()[0]["deviceName"]
+
+def _cached_name():
+    """设备名称, 云端不可用且没有记录时返回 None"""
+    try:
+        return device_name()
+    except Exception:
+        return None
+
+def get_ikuai():
+    global ikuai_client
+    if ikuai_client is None:
+        ikuai_client=ikuai.core.IKuaiClient(
+            url=settings.ikuai_url,
+            username=settings.ikuai_username,
+            password=settings.ikuai_password,
+            session_factory=net.transport.transport.new_session
+        )
+    return ikuai_client
+
+def _cloud_power_on(name):
+    if set_power(name,1):
+        return True
+    # 缓存的设备名可能已失效, 重新查询
+    runner.state.delete("device")
+    return set_power(list_devices()[0]["deviceName"],1)
+
+def send_magic(macs):
+    return net.wol.send(
+        macs,
+        password=getattr(settings,"wake_secureon",None),
+        broadcasts=getattr(settings,"wake_broadcasts",()),
+        bursts=getattr(settings,"wake_bursts",3)
+    )
+
+def wake_mechanisms(name,mac=None):
+    """已配置的唤醒方式, settings.wake_mechanisms 可限定使用其中几种"""
+    enabled=getattr(settings,"wake_mechanisms",["cloud","ikuai","magic"])
+    mac=mac or getattr(settings,"wake_mac",None)
+    mechanisms=[]
+    if "cloud" in enabled and name and getattr(settings,"wake_username",None):
+        mechanisms.append(remote.wake.Mechanism("cloud",lambda: _cloud_power_on(name)))
+    if "ikuai" in enabled and mac and getattr(settings,"ikuai_url",None):
+        mechanisms.append(remote.wake.Mechanism("ikuai",lambda: get_ikuai().wake_on_lan(mac)))
+    if "magic" in enabled and mac:
+        mechanisms.append(remote.wake.Mechanism("magic",lambda: send_magic([mac]),confirmed=False))
+    return mechanisms
+
+def poweron_fleet():
+    """settings.workstations 配置了多台工作站时, 同时开机并选用最先就绪的一台"""
+    global chosen
+    def status(member):
+        return int(_find_device(list_devices(),member["name"])[0]["status"])
+    orchestrators={}
+    def orchestrator(member):
+        if member["name"] not in orchestrators:
+            orchestrators[member["name"]]=remote.wake.WakeOrchestrator(
+                member["name"],wake_mechanisms(member["name"],member.get("mac")))
+        return orchestrators[member["name"]]
+    def is_on(member):
+        try:
+            return status(member)==1
+        except Exception:
+            # 云端不可用时视为未开机, 由其他唤醒方式开机
+            return False
+    fleet=remote.fleet.Fleet(
+        settings.workstations,
+        is_on=is_on,
+        power_on=lambda member: orchestrator(member).wake(),
+        power_off=(lambda member: set_power(member["name"],"shutdown"))
+            if getattr(settings,"fleet_shutdown_others",False) else None,
+        parallelism=getattr(settings,"fleet_parallelism",2),
+        timeout=getattr(settings,"boot_timeout",100),
+        status=status,
+        model=remote.boot_model.BootModel
+    )
+    chosen=fleet.start()
+    if chosen["name"] in orchestrators and chosen["name"] in fleet.booted:
+        # 只有被选中且确实经历了开机的工作站, 据此记录唤醒方式的统计
+        orchestrators[chosen["name"]].woke()
+    return f"{chosen['name']} 已就绪"
+
+def _booted(model,orchestrator,start,stats):
+    # 云端查询失败 (或中继离线) 时已开机的工作站也会被唤醒, 第一次探测即就绪说明并未经历开机,
+    # 不记录开机耗时与唤醒方式的统计
+    if stats["rounds"]>1:
+        model.record(time.monotonic()-start)
+        orchestrator.woke()
+
 def poweron():
-    if not check():
-        set_power(list_devices()[0]["deviceName"],1)
-        time.sleep(20)
-        return check()
+    if getattr(settings,"workstations",None):
+        return poweron_fleet()
+    try:
+        on=check()
+        cloud=True
+    except Exception:
+        # 云端查询失败: 视为未开机, 仍用其他方式唤醒, 只通过RDP端口判断就绪
+        on=False
+        cloud=False
+    if not on:
+        name=_cached_name()
+        start=time.monotonic()
+        orchestrator=remote.wake.WakeOrchestrator(name or "workstation",wake_mechanisms(name))
+        orchestrator.wake()
+        model=remote.boot_model.BootModel(name or "workstation")
+        stats={}
+        res=remote.ready.wait_ready(
+            status=(lambda: int(list_devices()[0]["status"])) if cloud else None,
+            addresses=rdp_addresses,
+            port=settings.rdp_port,
+            timeout=getattr(settings,"boot_timeout",100),
+            intervals=model.schedule(start),
+            stats=stats
+        )
+        _booted(model,orchestrator,start,stats)
+        return res
     return True
 
-# def check():
-#     global ips
-#     ips=requests.get(settings.ip_url).json()
-#     if not ips:
-#         raise Exception("无法获取IP")
-#     if "192.168.1.10" in ips["lan"]:
-#         return True
-#     return False
-
-# def poweron():
-#     res=check()
-#     if not res:
-#         ikuai_client = ikuai.core.IKuaiClient(
-#             url=settings.ikuai_url,
-#             username=settings.ikuai_username,
-#             password=settings.ikuai_password    
-#         )
-#         ikuai_client.wake_on_lan(settings.wake_mac)
-#         while not res:
-#             res=check()
-#             time.sleep(1)
-#     return res
+async def _fetch_devices_async():
+    res=await net.ahttp.post(f"{wake_url}/Esp_Api_advance.php",
+                             json=_list_devices_payload(),timeout=2)
+    return _parse_devices(res.text)
+
+async def list_devices_async():
+    return await registry.get_async(_fetch_devices_async)
+
+async def set_power_async(name,state):
+    try:
+        res=await net.ahttp.post(f"{wake_url}/Esp_Api_new.php",
+                                 json=_set_power_payload(name,state),timeout=2)
+        return _parse_power(res.text)
+    finally:
+        registry.invalidate()
+
+async def check_async():
+    if chosen:
+        return _check_status(_find_device(await list_devices_async(),chosen["name"]))
+    return _check_status(await list_devices_async())
+
+async def device_name_async():
+    device=runner.state.get("device")
+    if device:
+        return device["name"]
+    return (await list_devices_async())[0]["deviceName"]
+
+async def poweron_async():
+    if getattr(settings,"workstations",None):
+        import asyncio
+        return await asyncio.to_thread(poweron_fleet)
+    try:
+        on=await check_async()
+        cloud=True
+    except Exception:
+        on=False
+        cloud=False
+    if not on:
+        import asyncio
+        try:
+            name=await device_name_async()
+        except Exception:
+            name=None
+        start=time.monotonic()
+        orchestrator=remote.wake.WakeOrchestrator(name or "workstation",wake_mechanisms(name))
+        await asyncio.to_thread(orchestrator.wake)
+
+        async def status():
+            return int((await list_devices_async())[0]["status"])
+
+        model=remote.boot_model.BootModel(name or "workstation")
+        stats={}
+        res=await remote.ready.wait_ready_async(
+            status=status if cloud else None,
+            addresses=rdp_addresses,
+            port=settings.rdp_port,
+            timeout=getattr(settings,"boot_timeout",100),
+            intervals=model.schedule(start),
+            stats=stats
+        )
+        _booted(model,orchestrator,start,stats)
+        return res
+    return True
 
 ips=[]
+chosen=None
+ikuai_client=None
@@ -0,0 +1,59 @@
+# 开机耗时模型: 记录每台设备从开机命令到就绪的耗时, 按分位数安排就绪轮询
+import time
+
+import runner.state
+
+from . import ready
+
+
+class BootModel:
+    def __init__(self, device, history=50, min_samples=3):
+        """
+        :param history: 保留的最近记录数
+        :param min_samples: 记录少于该数量时使用默认的轮询间隔
+        """
+        self.key = f"boot.{device}"
+        self.history = history
+        self.min_samples = min_samples
+
+    @property
+    def samples(self):
+        return runner.state.get(self.key, [])
+
+    def record(self, seconds):
+        runner.state.put(self.key, (self.samples + [round(seconds, 3)])[-self.history:])
+
+    def percentile(self, q):
+        samples = sorted(self.samples)
+        if not samples:
+            return None
+        index = (len(samples) - 1) * q / 100
+        low = int(index)
+        high = min(low + 1, len(samples) - 1)
+        return samples[low] + (samples[high] - samples[low]) * (index - low)
+
+    def schedule(self, start=None, dense=0.25, sparse=5.0, margin=1.0):
+        """轮询间隔: 预计就绪前稀疏, p10~p90 之间密集, 超过 p90 后逐渐放宽
+
+        :param start: 发出开机命令的 time.monotonic(), 默认为当前时间
+        :param dense: 预计就绪区间内的间隔(秒)
+        :param sparse: 最大间隔(秒)
+        :param margin: 密集区间向前后各扩展的秒数
+        """
+        if len(self.samples) < self.min_samples:
+            yield from ready.schedule()
+            return
+        start = time.monotonic() if start is None else start
+        early = self.percentile(10) - margin
+        late = self.percentile(90) + margin
+        backoff = dense
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed < early:
+                # 距离预计就绪还远, 每次等待剩余时间的一半
+                yield min(max((early - elapsed) / 2, dense), sparse)
+            elif elapsed <= late:
+                yield dense
+            else:
+                backoff = min(backoff * 1.5, sparse)
+                yield backoff
@@ -0,0 +1,97 @@
+# 多台工作站: 同时开机, 使用最先可以连接的一台
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ready
+
+
+class Fleet:
+    def __init__(self, members, is_on, power_on, power_off=None, parallelism=2,
+                 timeout=100, status=None, model=None):
+        """
+        :param members: 工作站配置列表, 每项包含 name (云端设备名) 与 address, 可选 port
+        :param is_on: is_on(member) 返回是否已开机
+        :param power_on: power_on(member) 发送开机命令
+        :param power_off: power_off(member), 提供时关闭本次开机但未被选中的工作站
+        :param parallelism: 同时开机等待的工作站数量
+        :param status: status(member) 返回设备状态, 供没有地址的工作站判断就绪
+        :param model: model(name) 返回该设备的 BootModel, 用于安排轮询并记录开机耗时
+        """
+        self.members = members
+        self.is_on = is_on
+        self.power_on = power_on
+        self.power_off = power_off
+        self.parallelism = parallelism
+        self.timeout = timeout
+        self.status = status
+        self.model = model
+        self.states = {m["name"]: "pending" for m in members}
+        self.chosen = None
+        # 第一次探测时未就绪、确实经历了开机的工作站
+        self.booted = set()
+        self._chosen = threading.Event()
+        self._lock = threading.Lock()
+        self._started = set()
+
+    def _boot(self, member):
+        name = member["name"]
+        if self._chosen.is_set():
+            self.states[name] = "skipped"
+            return
+        model = self.model(name) if self.model else None
+        start = time.monotonic()
+        try:
+            booting = not self.is_on(member)
+            if booting:
+                self.states[name] = "booting"
+                self.power_on(member)
+                with self._lock:
+                    self._started.add(name)
+            else:
+                self.states[name] = "on"
+            address = member.get("address")
+            stats = {}
+            if not ready.wait_ready(
+                    status=(lambda: self.status(member)) if self.status else None,
+                    addresses=[address] if address else [],
+                    port=member.get("port", 3389),
+                    timeout=self.timeout,
+                    intervals=model.schedule(start) if model and booting else None,
+                    cancel=self._chosen, stats=stats):
+                self.states[name] = "not_chosen"
+                return
+            if booting and stats["rounds"] > 1:
+                # 状态查询失败时可能把已开机的工作站当作未开机, 第一次探测即就绪的不计入开机耗时
+                with self._lock:
+                    self.booted.add(name)
+                if model:
+                    model.record(time.monotonic() - start)
+        except Exception:
+            self.states[name] = "failed"
+            return
+        with self._lock:
+            if self.chosen is None:
+                self.chosen = member
+                self.states[name] = "chosen"
+                self._chosen.set()
+            else:
+                self.states[name] = "not_chosen"
+
+    def start(self):
+        """返回最先就绪的工作站, 全部失败时抛出异常"""
+        with ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+            futures = [pool.submit(self._boot, member) for member in self.members]
+            for future in futures:
+                future.result()
+        if self.chosen is None:
+            raise Exception("没有可用的工作站: " + ", ".join(
+                f"{name}({state})" for name, state in self.states.items()))
+        if self.power_off:
+            for member in self.members:
+                if member["name"] in self._started and member is not self.chosen:
+                    try:
+                        self.power_off(member)
+                    except Exception:
+                        pass
+        return self.chosen
@@ -0,0 +1,209 @@
+# 远程桌面客户端: mstsc / xfreerdp 后端, 监督会话进程, 异常退出或目标不可达时立即重连
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from .link import PRESETS
+from .ready import probe_tcp
+
+# 每次重连从发现断开到重新启动的客户端稳定运行 (持续 stable_after 秒未退出) 的耗时 (秒),
+# 包含稳定期本身; 稳定期内客户端再次退出的重连只计入 unstable
+reconnects = []
+unstable = 0
+_lock = threading.Lock()
+
+
+class Launcher:
+    name = None
+    # 表示会话正常结束 (用户关闭、注销或在远程端断开) 的返回值, 不重连
+    normal_exit = frozenset({0})
+    # 不小于此值的返回值为认证、参数等无法通过重连解决的错误, None 为没有这类返回值
+    fatal_exit = None
+
+    def command(self, profile, address, tier):
+        """启动客户端的命令行
+
+        :param profile: .rdp 文件路径
+        :param address: 主机:端口
+        :param tier: remote.link 中的档位名称
+        """
+        raise NotImplementedError
+
+    def spawn(self, profile, address, tier):
+        return subprocess.Popen(self.command(profile, address, tier))
+
+
+class MstscLauncher(Launcher):
+    """Windows 自带的远程桌面客户端, 所有设置来自 .rdp 文件
+
+    mstsc 在用户关闭窗口与连接中断时都返回 0, 断线只能通过端口探测发现.
+    """
+    name = "mstsc"
+
+    def command(self, profile, address, tier):
+        return ["mstsc", profile]
+
+
+class XfreerdpLauncher(Launcher):
+    """FreeRDP 客户端: 读取同一个 .rdp 文件, 档位中的选项另外通过命令行指定"""
+    name = "xfreerdp"
+    # 1/2 远程端断开/注销, 11/12 用户在会话中断开/注销
+    normal_exit = frozenset({0, 1, 2, 11, 12})
+    # 128 起为连接、认证与参数错误
+    fatal_exit = 128
+
+    NETWORK = {"lan": "lan", "broadband": "auto", "slow": "modem"}
+
+    def __init__(self, executable="xfreerdp", args=()):
+        self.executable = executable
+        self.args = list(args)
+
+    def command(self, profile, address, tier):
+        preset = PRESETS[tier]
+        return [
+            self.executable, profile, f"/v:{address}",
+            f"/bpp:{preset['session bpp:i']}",
+            f"/network:{self.NETWORK[tier]}",
+            ("+" if preset["compression:i"] else "-") + "compression",
+            ("+" if preset["bitmapcachepersistenable:i"] else "-") + "bitmap-cache",
+            ("+" if preset["udp"] else "-") + "multitransport",
+            "+auto-reconnect",
+        ] + self.args
+
+
+def default(name=None, args=()):
+    """按名称或当前平台选择客户端: mstsc / xfreerdp"""
+    if name is None:
+        if sys.platform == "win32":
+            name = "mstsc"
+        elif shutil.which("xfreerdp3") and not shutil.which("xfreerdp"):
+            name = "xfreerdp3"
+        else:
+            name = "xfreerdp"
+    if name == "mstsc":
+        return MstscLauncher()
+    return XfreerdpLauncher(executable=name, args=args)
+
+
+class Session:
+    def __init__(self, launcher, prepare, max_restarts=5, restart_window=300,
+                 watch_interval=15, freeze_after=3, ready_timeout=10, stable_after=5,
+                 on_reconnect=None):
+        """
+        客户端本身是否卡死无从得知 (mstsc 断线时也不退出), 只能由目标主机的可达性推断:
+        会话运行时每 watch_interval 秒向目标端口发起一次TCP连接, 连续 freeze_after 次失败
+        视为会话中断并重连. 目标可达但客户端界面卡住的情况不会被发现.
+
+        :param prepare: prepare(主机, 端口) 写出 .rdp 文件, 返回 (文件路径, 档位);
+                        重连时复用上次的结果, 不重新测量
+        :param max_restarts: restart_window 秒内最多重连的次数, 超过后放弃
+        :param watch_interval: 会话运行时探测目标端口的间隔
+        :param freeze_after: 连续多少次探测失败视为会话中断
+        :param stable_after: 重新启动的客户端持续运行多少秒视为重连完成
+        :param on_reconnect: 每次重连后以说明文字调用
+        """
+        self.launcher = launcher
+        self.prepare = prepare
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.watch_interval = watch_interval
+        self.freeze_after = freeze_after
+        self.ready_timeout = ready_timeout
+        self.stable_after = stable_after
+        self.on_reconnect = on_reconnect
+        self.process = None
+        self.host = None
+        self.port = None
+        self._profile = None
+        self._restarts = []
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def start(self, host, port):
+        self.host, self.port = host, port
+        self._profile = self.prepare(host, port)
+        self.process = self.launcher.spawn(self._profile[0], self.address, self._profile[1])
+
+    def switch(self, host, port):
+        """改为连接另一个地址 (如缓存的IP已失效), 不计入重连次数"""
+        self.stop()
+        self.start(host, port)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def _reconnect(self, reason):
+        """重新启动客户端, 等待目标端口可达且客户端稳定运行, 返回重连耗时
+
+        客户端在稳定期内退出时返回 None, 由 wait() 按退出处理.
+        """
+        global unstable
+        now = time.monotonic()
+        self._restarts = [t for t in self._restarts if now - t < self.restart_window]
+        if len(self._restarts) >= self.max_restarts:
+            raise Exception(f"远程桌面{reason}, {self.restart_window}s内已重连"
+                            f"{len(self._restarts)}次, 放弃")
+        self._restarts.append(now)
+        self.stop()
+        self.process = self.launcher.spawn(self._profile[0], self.address, self._profile[1])
+        while probe_tcp(self.host, self.port) is None and self.process.poll() is None:
+            if time.monotonic() - now > self.ready_timeout:
+                break
+            time.sleep(0.2)
+        try:
+            code = self.process.wait(self.stable_after)
+        except subprocess.TimeoutExpired:
+            latency = time.monotonic() - now
+            with _lock:
+                reconnects.append(latency)
+            if self.on_reconnect:
+                self.on_reconnect(f"远程桌面{reason}, 已重新连接 ({latency:.1f}s)")
+            return latency
+        with _lock:
+            unstable += 1
+        if self.on_reconnect:
+            self.on_reconnect(f"远程桌面{reason}, 重新启动的客户端 {self.stable_after}s 内退出"
+                              f" (返回值 {code})")
+        return None
+
+    def wait(self):
+        """监督会话直到用户正常关闭客户端, 返回 True"""
+        failures = 0
+        while True:
+            try:
+                code = self.process.wait(self.watch_interval)
+            except subprocess.TimeoutExpired:
+                if probe_tcp(self.host, self.port) is None:
+                    failures += 1
+                else:
+                    failures = 0
+                if failures >= self.freeze_after:
+                    failures = 0
+                    self._reconnect("无响应")
+                continue
+            if code in self.launcher.normal_exit:
+                return True
+            if self.launcher.fatal_exit is not None and code >= self.launcher.fatal_exit:
+                raise Exception(f"远程桌面客户端出错 (返回值 {code}), 不再重连")
+            self._reconnect(f"异常退出 (返回值 {code})")
+
+
+def metrics():
+    """成功重连次数与平均、最大耗时 (含稳定期), 以及重连后很快再次退出的次数"""
+    with _lock:
+        values = list(reconnects)
+        failed = unstable
+    if not values and not failed:
+        return None
+    return {"count": len(values), "unstable": failed,
+            "mean": sum(values) / len(values) if values else 0.0,
+            "max": max(values, default=0.0)}
@@ -0,0 +1,159 @@
+# 链路质量: 测量到RDP目标的延迟、抖动、丢包与大致带宽, 按档位生成 .rdp 配置
+import statistics
+import time
+
+from .ready import probe_tcp
+
+LAN = "lan"
+BROADBAND = "broadband"
+SLOW = "slow"
+
+# .rdp 属性档位; udp 不是 .rdp 属性, 由支持的客户端 (xfreerdp) 使用
+PRESETS = {
+    LAN: {
+        "session bpp:i": 32,
+        "compression:i": 0,
+        "connection type:i": 6,
+        "networkautodetect:i": 0,
+        "bandwidthautodetect:i": 1,
+        "bitmapcachepersistenable:i": 1,
+        "disable wallpaper:i": 0,
+        "disable full window drag:i": 0,
+        "disable menu anims:i": 0,
+        "disable themes:i": 0,
+        "allow font smoothing:i": 1,
+        "allow desktop composition:i": 1,
+        "udp": True,
+    },
+    BROADBAND: {
+        "session bpp:i": 32,
+        "compression:i": 1,
+        "connection type:i": 7,
+        "networkautodetect:i": 1,
+        "bandwidthautodetect:i": 1,
+        "bitmapcachepersistenable:i": 1,
+        "disable wallpaper:i": 1,
+        "disable full window drag:i": 1,
+        "disable menu anims:i": 1,
+        "disable themes:i": 0,
+        "allow font smoothing:i": 1,
+        "allow desktop composition:i": 0,
+        "udp": True,
+    },
+    SLOW: {
+        "session bpp:i": 16,
+        "compression:i": 1,
+        "connection type:i": 2,
+        "networkautodetect:i": 0,
+        "bandwidthautodetect:i": 0,
+        "bitmapcachepersistenable:i": 1,
+        "disable wallpaper:i": 1,
+        "disable full window drag:i": 1,
+        "disable menu anims:i": 1,
+        "disable themes:i": 1,
+        "allow font smoothing:i": 0,
+        "allow desktop composition:i": 0,
+        "udp": False,
+    },
+}
+
+
+class LinkQuality:
+    def __init__(self, rtt=None, jitter=None, loss=0.0, throughput=None):
+        """
+        :param rtt: TCP握手耗时中位数 (秒)
+        :param jitter: 相邻两次握手耗时之差的平均值 (秒)
+        :param loss: 握手失败的比例
+        :param throughput: 大致下载速度 (Mbit/s), 未测量时为 None
+        """
+        self.rtt = rtt
+        self.jitter = jitter
+        self.loss = loss
+        self.throughput = throughput
+
+    def tier(self):
+        if self.rtt is None or self.loss >= 0.2 or self.rtt >= 0.15 or \
+                (self.throughput is not None and self.throughput < 2):
+            return SLOW
+        if self.rtt >= 0.02 or self.loss > 0 or (self.jitter or 0) >= 0.01 or \
+                (self.throughput is not None and self.throughput < 50):
+            return BROADBAND
+        return LAN
+
+    def as_dict(self):
+        return {"rtt": self.rtt, "jitter": self.jitter, "loss": self.loss,
+                "throughput": self.throughput}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __str__(self):
+        if self.rtt is None:
+            return "不可达"
+        text = f"延迟 {self.rtt * 1000:.0f}ms 抖动 {(self.jitter or 0) * 1000:.0f}ms 丢包 {self.loss:.0%}"
+        if self.throughput is not None:
+            text += f" 带宽 {self.throughput:.1f}Mbit/s"
+        return text
+
+
+def throughput(session, url, limit=1 << 20, timeout=5):
+    """下载 url 的前 limit 字节估算带宽 (Mbit/s), 失败时返回 None"""
+    try:
+        start = time.monotonic()
+        received = 0
+        with session.get(url, stream=True, timeout=timeout) as res:
+            for chunk in res.iter_content(64 * 1024):
+                received += len(chunk)
+                if received >= limit or time.monotonic() - start > timeout:
+                    break
+        elapsed = time.monotonic() - start
+    except Exception:
+        return None
+    if not received or not elapsed:
+        return None
+    return received * 8 / elapsed / 1e6
+
+
+def measure(host, port, samples=5, interval=0.02, timeout=1, throughput_probe=None,
+            known_rtt=None, give_up=2):
+    """连续进行 samples 次TCP握手测量链路质量
+
+    :param throughput_probe: 可选的无参函数, 返回大致带宽 (Mbit/s)
+    :param known_rtt: 已测得的握手耗时 (如选择目标时的探测), 作为第一个样本
+    :param give_up: 开头连续失败这么多次时不再测量, 目标多半不可达
+    """
+    rtts = [] if known_rtt is None else [known_rtt]
+    failed = 0
+    for number in range(len(rtts), samples):
+        if not rtts and failed >= give_up:
+            break
+        if number:
+            time.sleep(interval)
+        rtt = probe_tcp(host, port, timeout)
+        if rtt is None:
+            failed += 1
+        else:
+            rtts.append(rtt)
+    jitter = None
+    if len(rtts) > 1:
+        jitter = statistics.mean(abs(a - b) for a, b in zip(rtts, rtts[1:]))
+    return LinkQuality(
+        rtt=statistics.median(rtts) if rtts else None,
+        jitter=jitter,
+        loss=failed / (len(rtts) + failed),
+        throughput=throughput_probe() if throughput_probe and rtts else None,
+    )
+
+
+def render(template, address, tier):
+    """用地址与档位填充 .rdp 模板: 模板中已有的档位属性被替换, 缺少的追加在末尾"""
+    preset = {key: value for key, value in PRESETS[tier].items() if ":" in key}
+    lines = []
+    for line in template.replace("$$address$$", address).splitlines():
+        key = ":".join(line.split(":")[:2])
+        if key in preset:
+            line = f"{key}:{preset.pop(key)}"
+        lines.append(line)
+    lines += [f"{key}:{value}" for key, value in preset.items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,105 @@
+# 等待工作站就绪: 轮询设备状态并探测RDP端口, 间隔逐渐收紧
+import socket
+import time
+
+
+def probe_tcp(host, port, timeout=1):
+    """TCP连接成功返回握手耗时(秒), 失败返回 None"""
+    start = time.monotonic()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return time.monotonic() - start
+    except OSError:
+        return None
+
+
+def schedule(first=2.0, minimum=0.25, factor=0.7):
+    """轮询间隔: 从 first 开始按 factor 递减, 不低于 minimum"""
+    interval = first
+    while True:
+        yield interval
+        interval = max(interval * factor, minimum)
+
+
+def wait_ready(status=None, addresses=(), port=3389, timeout=120,
+               status_interval=2.0, intervals=None, cancel=None, stats=None):
+    """等待工作站就绪
+
+    :param status: 返回设备状态的函数 (1: 开机), 调用有网络开销, 只在没有可探测的地址时
+                   使用, 并按 status_interval 限频
+    :param addresses: RDP主机地址列表或返回该列表的函数, 任一地址接受连接即视为就绪
+    :param intervals: 轮询间隔的迭代器, 默认使用 schedule()
+    :param cancel: threading.Event, 被设置时停止等待并返回 False
+    :param stats: 可选的字典, 写入 rounds: 探测的轮数; 为 1 时工作站在第一次探测时已就绪,
+                  耗时不代表开机时间
+    :return: 就绪时返回 True, 超时抛出异常
+    """
+    intervals = intervals or schedule()
+    start = time.monotonic()
+    last_status = None
+    powered = False
+    if stats is None:
+        stats = {}
+    stats["rounds"] = 0
+    while True:
+        stats["rounds"] += 1
+        hosts = addresses() if callable(addresses) else addresses
+        for host in hosts:
+            if probe_tcp(host, port) is not None:
+                return True
+        now = time.monotonic()
+        if status is not None and not hosts and (
+                last_status is None or now - last_status >= status_interval):
+            last_status = now
+            try:
+                powered = status() == 1
+            except Exception:
+                powered = False
+            if powered and not hosts:
+                return True
+        delay = next(intervals)
+        if time.monotonic() - start + delay > timeout:
+            raise Exception(
+                f"等待工作站就绪超时({timeout}s)" + (", 设备已开机" if powered else ""))
+        if cancel is not None:
+            if cancel.wait(delay):
+                return False
+        else:
+            time.sleep(delay)
+
+
+async def wait_ready_async(status=None, addresses=(), port=3389, timeout=120,
+                           status_interval=2.0, intervals=None, stats=None):
+    """wait_ready 的协程版本: 所有地址同时探测, status 为协程函数"""
+    import asyncio
+    import net.ahttp
+
+    intervals = intervals or schedule()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    last_status = None
+    powered = False
+    if stats is None:
+        stats = {}
+    stats["rounds"] = 0
+    while True:
+        stats["rounds"] += 1
+        hosts = addresses() if callable(addresses) else addresses
+        probes = [net.ahttp.probe_tcp(host, port) for host in hosts]
+        if status is not None and not hosts and (
+                last_status is None or loop.time() - last_status >= status_interval):
+            last_status = loop.time()
+            probes.append(status())
+        results = await asyncio.gather(*probes, return_exceptions=True)
+        if any(r is not None and not isinstance(r, BaseException)
+               for r in results[:len(hosts)]):
+            return True
+        if len(results) > len(hosts):
+            powered = results[-1] == 1
+            if powered and not hosts:
+                return True
+        delay = next(intervals)
+        if loop.time() - start + delay > timeout:
+            raise Exception(
+                f"等待工作站就绪超时({timeout}s)" + (", 设备已开机" if powered else ""))
+        await asyncio.sleep(delay)
@@ -0,0 +1,162 @@
+# 工作站IP: 同时向所有来源 (IP查询服务、iKuai WAN 与终端监控) 查询, 采用第一个一致的结果
+import ipaddress
+import threading
+import time
+
+import runner.state
+import runner.stats
+
+
+class Source:
+    def __init__(self, name, fetch):
+        """
+        :param fetch: 无参函数, 返回 {"wan": [...], "lan": [...]}, lan 为工作站的私有局域网地址
+        """
+        self.name = name
+        self.fetch = fetch
+
+
+def lan(addresses):
+    """只保留私有且非链路本地 (169.254.x.x) 的地址, 各来源的 lan 统一按此含义返回"""
+    result = []
+    for address in addresses or []:
+        try:
+            ip = ipaddress.IPv4Address(address)
+        except (ipaddress.AddressValueError, TypeError):
+            continue
+        if ip.is_private and not ip.is_link_local and address not in result:
+            result.append(address)
+    return result
+
+
+def valid(answer):
+    """结果至少包含一个WAN地址, 且所有地址都是合法的IPv4地址"""
+    if not isinstance(answer, dict) or not answer.get("wan"):
+        return False
+    try:
+        for address in list(answer["wan"]) + list(answer.get("lan") or []):
+            ipaddress.IPv4Address(address)
+    except (ipaddress.AddressValueError, TypeError):
+        return False
+    return True
+
+
+def agree(a, b):
+    """两个结果至少有一个相同的WAN地址"""
+    return bool(set(a["wan"]) & set(b["wan"]))
+
+
+class Resolver:
+    def __init__(self, sources, ttl=60, timeout=5, key="ips", confirm=1.0):
+        """
+        :param ttl: 结果缓存的秒数
+        :param timeout: 等待有效结果的最长时间
+        :param key: 结果与来源统计在 state.json 中的键名前缀
+        :param confirm: 结果与上次记录的WAN地址不一致时, 等待其他来源确认的最长时间
+        """
+        self.sources = list(sources)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.key = key
+        self.confirm = confirm
+        self._lock = threading.Lock()
+        self.stats = runner.state.get(f"{key}.sources", {})
+        self.last = None
+
+    def cached(self):
+        return runner.state.get(self.key, max_age=self.ttl)
+
+    def invalidate(self):
+        runner.state.delete(self.key)
+
+    def _record(self, name, latency=None, won=False):
+        with self._lock:
+            stat = self.stats.setdefault(name, {"wins": 0, "count": 0})
+            if latency is not None:
+                runner.stats.smooth(stat, latency)
+                stat["count"] += 1
+            stat["wins"] += won
+            stats = {name: dict(stat) for name, stat in self.stats.items()}
+        runner.state.put(f"{self.key}.sources", stats)
+
+    def fastest(self):
+        """历史平均耗时最短的来源名称"""
+        with self._lock:
+            timed = [(stat["latency"], name) for name, stat in self.stats.items()
+                     if "latency" in stat]
+        return min(timed)[1] if timed else None
+
+    @staticmethod
+    def _consistent(answers, known):
+        """第一个与上次记录的结果或另一个来源一致的结果, 返回 (来源, 结果) 或 None"""
+        for name, answer in answers:
+            if known and agree(answer, known):
+                return name, answer
+            if any(agree(answer, other) for other_name, other in answers if other_name != name):
+                return name, answer
+        return None
+
+    def resolve(self, refresh=False):
+        """返回 {"wan": [...], "lan": [...]}, 所有来源都失败或超时时抛出异常
+
+        采用第一个一致的结果: 与上次记录的WAN地址相同, 或有另一个来源给出相同的WAN地址.
+        第一个有效结果之后 confirm 秒内仍无法确认时采用第一个有效的结果.
+
+        :param refresh: 忽略缓存重新查询
+        """
+        if not refresh:
+            cached = self.cached()
+            if cached:
+                return cached
+        if not self.sources:
+            raise Exception("没有可用的IP来源")
+        known = runner.state.get(self.key)
+        changed = threading.Condition()
+        answers = []
+        errors = {}
+        finished = []
+
+        def run(source):
+            start = time.monotonic()
+            try:
+                answer = source.fetch()
+                if not valid(answer):
+                    raise Exception(f"结果无效: {answer}")
+            except Exception as e:
+                # 失败的来源按超时计入统计
+                errors[source.name] = e
+                self._record(source.name, self.timeout)
+                answer = None
+            else:
+                self._record(source.name, time.monotonic() - start)
+            with changed:
+                if answer is not None:
+                    answers.append((source.name, answer))
+                finished.append(source.name)
+                changed.notify_all()
+
+        for source in self.sources:
+            threading.Thread(target=run, args=(source,), daemon=True).start()
+        deadline = time.monotonic() + self.timeout
+        first = None
+        with changed:
+            while True:
+                picked = self._consistent(answers, known)
+                if picked or len(finished) == len(self.sources):
+                    break
+                if answers and first is None:
+                    first = time.monotonic()
+                end = deadline if first is None else min(deadline, first + self.confirm)
+                if end <= time.monotonic():
+                    break
+                changed.wait(end - time.monotonic())
+            if picked is None and answers:
+                picked = answers[0]
+        if picked is None:
+            detail = ", ".join(f"{name}: {e}" for name, e in errors.items()) or "超时"
+            raise Exception(f"无法获取IP ({detail})")
+        self.last, answer = picked
+        self._record(self.last, won=True)
+        answer = {"wan": list(answer["wan"]), "lan": list(answer.get("lan") or [])}
+        runner.state.put(self.key, answer)
+        return answer
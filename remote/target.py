@@ -0,0 +1,91 @@
+# 选择RDP目标: 同时探测所有候选地址, 优先局域网, 其次握手最快的地址
+import threading
+from queue import Empty, Queue
+
+from .ready import probe_tcp
+
+LAN = "lan"
+WAN = "wan"
+
+
+def candidates(lan=(), wan=()):
+    """[(地址, 类型)], 局域网地址在前, 去除重复"""
+    seen = set()
+    result = []
+    for kind, addresses in ((LAN, lan), (WAN, wan)):
+        for address in addresses or ():
+            if address and address not in seen:
+                seen.add(address)
+                result.append((address, kind))
+    return result
+
+
+class _Picker:
+    """按完成顺序接收探测结果, 决定何时可以选定目标
+
+    所有探测同时开始, 先完成的就是握手最快的地址: 第一个可用的局域网地址立即选定;
+    广域网地址需等到所有局域网地址都失败后才选定.
+    """
+
+    def __init__(self, kinds):
+        self.kinds = kinds
+        self.lan_pending = sum(kind == LAN for kind in kinds.values())
+        self.best = None
+
+    def feed(self, address, rtt):
+        """返回 (地址, 类型, 握手耗时) 表示已选定, 否则返回 None"""
+        kind = self.kinds[address]
+        if kind == LAN:
+            if rtt is not None:
+                return address, kind, rtt
+            self.lan_pending -= 1
+        elif rtt is not None and self.best is None:
+            self.best = (address, kind, rtt)
+        if self.best is not None and self.lan_pending == 0:
+            return self.best
+        return None
+
+
+def select(targets, port, timeout=1):
+    """同时向所有候选地址发起TCP连接, 返回 (地址, 类型, 握手耗时), 都不可达时返回 None"""
+    if not targets:
+        return None
+    queue = Queue()
+    kinds = dict(targets)
+    for address in kinds:
+        threading.Thread(target=lambda a: queue.put((a, probe_tcp(a, port, timeout))),
+                         args=(address,), daemon=True).start()
+    picker = _Picker(kinds)
+    for _ in kinds:
+        try:
+            picked = picker.feed(*queue.get(timeout=timeout + 1))
+        except Empty:
+            break
+        if picked:
+            return picked
+    return picker.best
+
+
+async def select_async(targets, port, timeout=1):
+    """select 的协程版本"""
+    import asyncio
+    import net.ahttp
+
+    if not targets:
+        return None
+    kinds = dict(targets)
+
+    async def probe(address):
+        return address, await net.ahttp.probe_tcp(address, port, timeout)
+
+    tasks = [asyncio.ensure_future(probe(address)) for address in kinds]
+    picker = _Picker(kinds)
+    try:
+        for future in asyncio.as_completed(tasks):
+            picked = picker.feed(*await future)
+            if picked:
+                return picked
+        return picker.best
+    finally:
+        for task in tasks:
+            task.cancel()
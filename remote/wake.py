@@ -0,0 +1,142 @@
+# 唤醒工作站: 同时使用所有已配置的唤醒方式 (松果云、iKuai wake_on_lan、本机魔术包)
+import threading
+import time
+
+import runner.state
+import runner.stats
+
+
+# 同一设备同一方式成功发送后, 该时间内不重复发送 (步骤重试时避免重复唤醒)
+DEDUPE_WINDOW = 30
+
+# 历史上唤醒成功的方式先单独发送, 该时间内确认成功则不再发送其他方式
+STAGGER = 1.0
+_fired = {}
+_fired_lock = threading.Lock()
+
+
+class Mechanism:
+    def __init__(self, name, func, confirmed=True):
+        """
+        :param func: 发送唤醒命令, 返回假值或抛出异常表示失败
+        :param confirmed: 成功是否代表命令已送达 (魔术包只能确认已发出)
+        """
+        self.name = name
+        self.func = func
+        self.confirmed = confirmed
+
+
+class WakeOrchestrator:
+    def __init__(self, device, mechanisms, dedupe_window=DEDUPE_WINDOW, stagger=STAGGER):
+        self.device = device
+        self.mechanisms = mechanisms
+        self.dedupe_window = dedupe_window
+        self.stagger = stagger
+        self.results = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._first = threading.Event()
+        self._confirmed = threading.Event()
+
+    @property
+    def stats(self):
+        return runner.state.get(f"wake.{self.device}", {})
+
+    def ranked(self):
+        """历史上唤醒成功次数多、发送快的方式排在前面"""
+        stats = self.stats
+
+        def score(mechanism):
+            stat = stats.get(mechanism.name, {})
+            return (-stat.get("wins", 0), stat.get("latency", float("inf")))
+        return sorted(self.mechanisms, key=score)
+
+    def _send(self, mechanism):
+        start = time.monotonic()
+        try:
+            ok = bool(mechanism.func())
+            error = None
+        except Exception as e:
+            ok, error = False, e
+        if ok:
+            # 只记录成功的发送, 失败的方式在重试时会再次发送
+            with _fired_lock:
+                _fired[(self.device, mechanism.name)] = time.monotonic()
+        with self._lock:
+            self.results[mechanism.name] = {
+                "ok": ok, "latency": time.monotonic() - start,
+                "done": time.monotonic(), "error": error,
+            }
+            if ok and mechanism.confirmed:
+                self._confirmed.set()
+            if ok or len(self.results) == self._count:
+                self._first.set()
+
+    def _dedupe(self, mechanism):
+        key = (self.device, mechanism.name)
+        with _fired_lock:
+            last = _fired.get(key)
+        return last is not None and time.monotonic() - last < self.dedupe_window
+
+    def _start(self, mechanism):
+        threading.Thread(target=self._send, args=(mechanism,), daemon=True).start()
+
+    def wake(self, timeout=10):
+        """发送唤醒命令, 等到第一个成功后返回本次发送的方式名称
+
+        历史上唤醒成功过的方式先单独发送, stagger 秒内确认送达则不再发送其他方式,
+        否则 (或没有历史记录时) 同时发送所有方式.
+        全部失败时抛出异常; 最近已成功发送过的方式会被跳过.
+        """
+        mechanisms = [m for m in self.ranked() if not self._dedupe(m)]
+        if not mechanisms:
+            return []
+        self._count = len(mechanisms)
+        first, rest = mechanisms[0], mechanisms[1:]
+        self._start(first)
+        if rest and first.confirmed and self.stats.get(first.name, {}).get("wins"):
+            # 等到首选方式确认成功、失败或超过 stagger
+            deadline = time.monotonic() + self.stagger
+            while not self._confirmed.is_set() and first.name not in self.results \
+                    and time.monotonic() < deadline:
+                self._confirmed.wait(0.02)
+        started = [first]
+        for mechanism in rest:
+            if self._confirmed.is_set():
+                break
+            self._start(mechanism)
+            started.append(mechanism)
+        with self._lock:
+            self._count = len(started)
+            if len(self.results) == self._count:
+                self._first.set()
+        self._first.wait(timeout)
+        with self._lock:
+            if not any(r["ok"] for r in self.results.values()) and \
+                    len(self.results) == self._count:
+                errors = ", ".join(f"{name}: {r['error'] or '失败'}"
+                                   for name, r in self.results.items())
+                raise Exception("所有唤醒方式均失败: " + errors)
+        return [m.name for m in started]
+
+    def woke(self):
+        """工作站就绪后调用: 记录各方式的发送耗时, 并把唤醒归功于最先确认成功的方式
+
+        无法确认送达的方式 (魔术包) 只有在没有其他方式成功时才计为唤醒者.
+        """
+        confirmed = {m.name: m.confirmed for m in self.mechanisms}
+        with self._lock:
+            succeeded = [(not confirmed[name], r["done"], name)
+                         for name, r in self.results.items() if r["ok"]]
+            results = dict(self.results)
+        winner = min(succeeded)[2] if succeeded else None
+        stats = self.stats
+        for name, result in results.items():
+            stat = stats.setdefault(name, {"wins": 0, "sent": 0})
+            stat["sent"] += 1
+            if result["ok"]:
+                runner.stats.smooth(stat, result["latency"])
+            if name == winner:
+                stat["wins"] += 1
+        runner.state.put(f"wake.{self.device}", stats)
+        return winner
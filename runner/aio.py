@@ -0,0 +1,26 @@
+# 在后台线程中运行唯一的事件循环, 所有协程步骤共用
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="asyncio",
+                             daemon=True).start()
+    return _loop
+
+
+def submit(coro):
+    """提交协程, 返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, loop())
+
+
+def run(coro, timeout=None):
+    """在同步代码中等待协程结果"""
+    return submit(coro).result(timeout)
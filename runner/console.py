@@ -0,0 +1,25 @@
+# 输出: rich 在后台线程加载, 加载完成前输出去掉样式标记的纯文本
+import builtins
+import re
+import threading
+
+_print = None
+_lock = threading.Lock()
+_markup = re.compile(r"\[/?(red|green|yellow|cyan|bold|dim)\]")
+
+
+def load():
+    global _print
+    if _print is None:
+        from rich import print as rich_print
+        with _lock:
+            _print = rich_print
+
+
+def print(*objects, **kwargs):
+    if _print is not None:
+        return _print(*objects, **kwargs)
+    objects = [_markup.sub("", o) if isinstance(o, str) else o for o in objects]
+    kwargs.setdefault("flush", True)
+    with _lock:
+        builtins.print(*objects, **kwargs)
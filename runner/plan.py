@@ -0,0 +1,72 @@
+# 编译 procedure.json: 校验一次并缓存到磁盘, 以文件修改时间为键
+import importlib
+import json
+import os
+import threading
+
+from . import console, retry, scheduler
+
+CACHE_VERSION = 2
+
+
+def _cache_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", name + ".plan")
+
+
+def _key(path):
+    stat = os.stat(path)
+    return [CACHE_VERSION, stat.st_mtime_ns, stat.st_size]
+
+
+def _load_cache(path, key):
+    try:
+        with open(_cache_path(path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != key:
+        return None
+    steps = cached["steps"]
+    for step in steps:
+        step["retry"] = retry.RetryPolicy(**step["retry"])
+    return steps
+
+
+def _save_cache(path, key, steps):
+    cache = _cache_path(path)
+    data = [dict(step, retry=step["retry"].as_dict()) for step in steps]
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(cache + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"key": key, "steps": data}, f, ensure_ascii=False)
+        os.replace(cache + ".tmp", cache)
+    except OSError:
+        pass
+
+
+def load(path):
+    """返回校验后的步骤列表, procedure.json 未修改时直接读取缓存"""
+    key = _key(path)
+    steps = _load_cache(path, key)
+    if steps is None:
+        with open(path, "r", encoding="utf-8") as f:
+            steps = scheduler.load_steps(json.loads(f.read()))
+        _save_cache(path, key, steps)
+    return steps
+
+
+def preload(steps):
+    """在后台线程中加载 rich、requests 与各任务模块, 不阻塞第一个步骤"""
+    def target():
+        console.load()
+        for name in ["requests"] + [step["module"] for step in steps]:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # 加载失败时由执行步骤时的加载报告错误
+                pass
+
+    thread = threading.Thread(target=target, name="preload", daemon=True)
+    thread.start()
+    return thread
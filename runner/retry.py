@@ -0,0 +1,103 @@
+# 步骤重试策略: 退避曲线、抖动、单次超时与总期限
+import random
+import threading
+import time
+
+
+class StepTimeout(Exception):
+    pass
+
+
+class StepFailed(Exception):
+    pass
+
+
+class RetryPolicy:
+    DEFAULTS = {
+        "attempts": None,       # 最大尝试次数, None 为不限
+        "backoff": "constant",  # constant / linear / exponential
+        "delay": 3,             # 首次重试前等待的秒数
+        "factor": 2,            # exponential 的倍率
+        "max_delay": 30,        # 单次等待上限
+        "jitter": 0,            # 随机抖动比例 (0~1)
+        "timeout": None,        # 单次尝试超时, None 为不限
+        "deadline": None,       # 从第一次尝试开始的总期限, None 为不限
+    }
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知的重试参数: {', '.join(sorted(unknown))}")
+        config = dict(self.DEFAULTS, **options)
+        if config["backoff"] not in ["constant", "linear", "exponential"]:
+            raise ValueError(f"未知的退避方式: {config['backoff']}")
+        if not 0 <= config["jitter"] <= 1:
+            raise ValueError("jitter 必须在 0~1 之间")
+        for key, value in config.items():
+            setattr(self, key, value)
+
+    @classmethod
+    def merge(cls, *configs):
+        options = {}
+        for config in configs:
+            options.update(config or {})
+        return cls(**options)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.DEFAULTS}
+
+    def backoff_delay(self, attempt):
+        """第 attempt 次失败后的等待时间 (attempt 从 1 开始)"""
+        if self.backoff == "exponential":
+            delay = self.delay * self.factor ** (attempt - 1)
+        elif self.backoff == "linear":
+            delay = self.delay * attempt
+        else:
+            delay = self.delay
+        delay = min(delay, self.max_delay)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0)
+
+    def attempt_timeout(self, start):
+        """本次尝试可用的时间, start 为第一次尝试开始的 time.monotonic()"""
+        timeout = self.timeout
+        if self.deadline is not None:
+            remaining = max(self.deadline - (time.monotonic() - start), 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def next_delay(self, attempt, start):
+        """第 attempt 次失败后的等待时间, 次数或期限用尽时返回 None"""
+        if self.attempts is not None and attempt >= self.attempts:
+            return None
+        delay = self.backoff_delay(attempt)
+        if self.deadline is not None:
+            if time.monotonic() - start + delay >= self.deadline:
+                return None
+        return delay
+
+
+def call_with_timeout(func, timeout):
+    """在独立线程中执行 func, 超时后放弃等待并抛出 StepTimeout
+
+    Python 无法强制结束线程, 超时的调用会在后台自行结束.
+    """
+    if timeout is None:
+        return func()
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise StepTimeout(f"单次执行超过 {timeout:g}s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
@@ -0,0 +1,234 @@
+# 依赖图调度: 按 procedure.json 中声明的依赖并行执行步骤
+import importlib
+import inspect
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import retry
+from .console import print
+
+
+class PlanError(Exception):
+    pass
+
+
+def load_steps(procedures):
+    """展开 procedure.json 为步骤列表, 并补全 id 与 depends
+
+    未声明 depends 的步骤依赖同一任务中的上一步;
+    任务的第一步未声明时使用任务级别的 depends.
+    """
+    steps = []
+    ids = set()
+    for procedure in procedures:
+        previous = None
+        for step in procedure["steps"]:
+            step_id = step.get("id", step["path"])
+            if step_id in ids:
+                raise PlanError(f"步骤ID重复: {step_id}")
+            ids.add(step_id)
+            if "depends" in step:
+                depends = list(step["depends"])
+            elif previous is not None:
+                depends = [previous]
+            else:
+                depends = list(procedure.get("depends", []))
+            try:
+                policy = retry.RetryPolicy.merge(
+                    procedure.get("retry"), step.get("retry"))
+            except ValueError as e:
+                raise PlanError(f"步骤 {step_id} 的重试策略错误: {e}")
+            if not step["path"].startswith(procedure["path"] + "."):
+                raise PlanError(
+                    f"步骤 {step_id} 的路径不在任务模块 {procedure['path']} 中")
+            steps.append({
+                "id": step_id,
+                "description": step["description"],
+                "path": step["path"],
+                "module": procedure["path"],
+                "attr": step["path"][len(procedure["path"]) + 1:],
+                "procedure": procedure["description"],
+                "depends": depends,
+                "retry": policy,
+                "health": step.get("health"),
+            })
+            previous = step_id
+    for step in steps:
+        for dep in step["depends"]:
+            if dep not in ids:
+                raise PlanError(f"步骤 {step['id']} 依赖不存在的步骤: {dep}")
+    _check_cycle(steps)
+    return steps
+
+
+def _check_cycle(steps):
+    depends = {step["id"]: step["depends"] for step in steps}
+    state = {}
+
+    def visit(step_id, chain):
+        if state.get(step_id) == "done":
+            return
+        if state.get(step_id) == "visiting":
+            raise PlanError("步骤存在循环依赖: " + " -> ".join(chain + [step_id]))
+        state[step_id] = "visiting"
+        for dep in depends[step_id]:
+            visit(dep, chain + [step_id])
+        state[step_id] = "done"
+
+    for step_id in depends:
+        visit(step_id, [])
+
+
+def resolve(step):
+    func = importlib.import_module(step["module"])
+    for name in step["attr"].split("."):
+        func = getattr(func, name)
+    return func
+
+
+def resolve_path(path):
+    """按 模块.函数 路径加载函数"""
+    module, _, attr = path.rpartition(".")
+    return getattr(importlib.import_module(module), attr)
+
+
+class _Handoff:
+    """协程步骤交给事件循环执行, 调度器改为等待 future"""
+
+    def __init__(self, future):
+        self.future = future
+
+
+def _report_success(step, res, attempt_start, tracer):
+    if tracer:
+        tracer.attempt(step["id"], attempt_start, result=res)
+        tracer.step_end(step["id"], "ok", result=res)
+    if type(res) == str:
+        status = res
+    else:
+        status = "[green]正常[/green]" if res else "[red]异常[/red]"
+    print(f"    执行步骤: {step['description']}  {status}")
+
+
+def _report_failure(step, e, attempt, start, attempt_start, tracer):
+    """记录一次失败, 返回重试前的等待时间; 不再重试时抛出 StepFailed"""
+    if tracer:
+        tracer.attempt(step["id"], attempt_start, error=e)
+    print(f"    执行步骤: {step['description']}  [red]失败[/red]")
+    print("    [red]错误信息: " + str(e) + "[/red]")
+    delay = step["retry"].next_delay(attempt, start)
+    if delay is None:
+        print(f"    [red]已尝试{attempt}次, 放弃执行[/red]")
+        if tracer:
+            tracer.step_end(step["id"], "failed", error=e)
+        raise retry.StepFailed(f"{step['id']}: {e}") from e
+    print(f"    [red]{delay:.1f}s后重试...[/red]")
+    return delay
+
+
+def run_step(step, tracer=None):
+    if tracer:
+        tracer.step_start(step)
+    try:
+        func = resolve(step)
+    except Exception as e:
+        print(f"    执行步骤: {step['description']}  [red]任务模块加载失败![/red]")
+        print("    [red]错误信息: " + str(e) + "[/red]")
+        if tracer:
+            tracer.step_end(step["id"], "failed", error=e)
+        raise retry.StepFailed(f"{step['id']}: {e}") from e
+    if inspect.iscoroutinefunction(func):
+        # 只有协程步骤才需要事件循环, 不在启动时导入 asyncio
+        from . import aio
+        return _Handoff(aio.submit(run_step_async(step, func, tracer)))
+    policy = step["retry"]
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_start = tracer.now() if tracer else None
+        try:
+            res = retry.call_with_timeout(func, policy.attempt_timeout(start))
+        except Exception as e:
+            time.sleep(_report_failure(
+                step, e, attempt, start, attempt_start, tracer))
+            continue
+        _report_success(step, res, attempt_start, tracer)
+        return res
+
+
+async def run_step_async(step, func, tracer=None):
+    """协程步骤: 超时通过取消协程实现, 退避等待不占用线程"""
+    import asyncio
+
+    if tracer:
+        tracer.step_thread(step["id"])
+    policy = step["retry"]
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_start = tracer.now() if tracer else None
+        timeout = policy.attempt_timeout(start)
+        try:
+            res = await asyncio.wait_for(func(), timeout)
+        except asyncio.TimeoutError:
+            e = retry.StepTimeout(f"单次执行超过 {timeout:g}s")
+            await asyncio.sleep(_report_failure(
+                step, e, attempt, start, attempt_start, tracer))
+            continue
+        except Exception as e:
+            await asyncio.sleep(_report_failure(
+                step, e, attempt, start, attempt_start, tracer))
+            continue
+        _report_success(step, res, attempt_start, tracer)
+        return res
+
+
+def run(steps, workers=4, tracer=None, only=None, status=None):
+    """执行步骤, 全部成功时返回 True
+
+    :param only: 只执行这些步骤ID, 其余步骤视为已完成
+    :param status: 可选的字典, 执行过程中写入 步骤ID -> running/ok/failed
+    """
+    if status is None:
+        status = {}
+    pending = {step["id"]: step for step in steps
+               if only is None or step["id"] in only}
+    done = {step["id"] for step in steps if step["id"] not in pending}
+    failed = set()
+    started = set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for step_id, step in list(pending.items()):
+                if any(dep in failed for dep in step["depends"]):
+                    print(f"    跳过步骤: {step['description']}  [red]依赖的步骤失败[/red]")
+                    if tracer:
+                        tracer.step_skip(step)
+                    del pending[step_id]
+                    failed.add(step_id)
+                    status[step_id] = "failed"
+                    continue
+                if not all(dep in done for dep in step["depends"]):
+                    continue
+                if step["procedure"] not in started:
+                    started.add(step["procedure"])
+                    print("执行任务: " + step["procedure"])
+                del pending[step_id]
+                status[step_id] = "running"
+                running[pool.submit(run_step, step, tracer)] = step_id
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step_id = running.pop(future)
+                if future.exception() is not None:
+                    failed.add(step_id)
+                    status[step_id] = "failed"
+                elif isinstance(future.result(), _Handoff):
+                    running[future.result().future] = step_id
+                else:
+                    done.add(step_id)
+                    status[step_id] = "ok"
+    return not failed
@@ -0,0 +1,87 @@
+# 上次运行的已知状态 (WAN IP、设备、登录时间), 保存在 state.json
+# 读写都复制值, 调用者修改自己的对象不会影响其他线程正在保存的数据.
+# 写入只更新内存, 由后台定时器在 SAVE_DELAY 秒后合并写入文件, 进程退出时写入剩余的修改.
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+
+PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "state.json")
+
+SAVE_DELAY = 1.0
+
+_lock = threading.Lock()
+_data = None
+_dirty = False
+_timer = None
+
+
+def _load():
+    global _data
+    if _data is None:
+        try:
+            with open(PATH, "r", encoding="utf-8") as f:
+                _data = json.load(f)
+        except (OSError, ValueError):
+            _data = {}
+    return _data
+
+
+def _save(data):
+    try:
+        with open(PATH + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(PATH + ".tmp", PATH)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def _changed():
+    """标记有未保存的修改, 必须持有 _lock"""
+    global _dirty, _timer
+    _dirty = True
+    if _timer is None:
+        _timer = threading.Timer(SAVE_DELAY, flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def flush():
+    """立即写入未保存的修改"""
+    global _dirty, _timer
+    with _lock:
+        _timer = None
+        if _dirty and _data is not None:
+            _save(_data)
+        _dirty = False
+
+
+atexit.register(flush)
+
+
+def get(key, default=None, max_age=None):
+    """读取缓存值, 超过 max_age 秒的值视为不存在"""
+    with _lock:
+        entry = _load().get(key)
+    if entry is None:
+        return default
+    if max_age is not None and time.time() - entry["time"] > max_age:
+        return default
+    return copy.deepcopy(entry["value"])
+
+
+def put(key, value):
+    value = copy.deepcopy(value)
+    with _lock:
+        data = _load()
+        data[key] = {"value": value, "time": time.time()}
+        _changed()
+
+
+def delete(key):
+    with _lock:
+        if _load().pop(key, None) is not None:
+            _changed()
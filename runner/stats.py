@@ -0,0 +1,8 @@
+# 保存在 state.json 中的耗时统计 (探测地址、唤醒方式、IP来源) 共用的平滑方法
+ALPHA = 0.3  # 指数移动平均的平滑系数
+
+
+def smooth(stat, latency, key="latency"):
+    """把 latency 计入 stat[key] 的指数移动平均, 第一次直接使用该值"""
+    stat[key] = latency if key not in stat else stat[key] + ALPHA * (latency - stat[key])
+    return stat[key]
@@ -0,0 +1,96 @@
+# 守护模式: 定期执行健康检查, 只重新执行失效步骤及其下游步骤
+import threading
+import time
+
+from . import retry, scheduler
+from .console import print
+from .trace import Tracer
+
+
+def downstream(steps, step_ids):
+    """返回 step_ids 以及所有直接或间接依赖它们的步骤"""
+    result = set(step_ids)
+    changed = True
+    while changed:
+        changed = False
+        for step in steps:
+            if step["id"] not in result and any(d in result for d in step["depends"]):
+                result.add(step["id"])
+                changed = True
+    return result
+
+
+class Supervisor:
+    def __init__(self, steps, workers=4, interval=30, health_timeout=10,
+                 on_pass=None):
+        """
+        :param interval: 健康检查间隔(秒)
+        :param on_pass: 每轮执行结束后调用 on_pass(tracer, ok)
+        """
+        self.steps = steps
+        self.workers = workers
+        self.interval = interval
+        self.health_timeout = health_timeout
+        self.on_pass = on_pass
+        self.status = {}
+        self._checks = {}
+
+    def _pass(self, only):
+        tracer = Tracer()
+        ok = scheduler.run(self.steps, workers=self.workers, tracer=tracer,
+                           only=only, status=self.status)
+        if self.on_pass:
+            self.on_pass(tracer, ok)
+
+    def start_pass(self, only=None):
+        for step in self.steps:
+            if only is None or step["id"] in only:
+                self.status[step["id"]] = "pending"
+        thread = threading.Thread(target=self._pass, args=(only,), daemon=True)
+        thread.start()
+        return thread
+
+    def busy(self):
+        return {k for k, v in self.status.items() if v in ["pending", "running"]}
+
+    def check(self, step):
+        """执行步骤的健康检查, 返回是否健康"""
+        try:
+            if step["health"] not in self._checks:
+                self._checks[step["health"]] = scheduler.resolve_path(step["health"])
+            return bool(retry.call_with_timeout(
+                self._checks[step["health"]], self.health_timeout))
+        except Exception:
+            return False
+
+    def broken(self):
+        """需要重新执行的步骤: 上一轮失败的步骤, 以及健康检查失败的已完成步骤"""
+        result = []
+        for step in self.steps:
+            state = self.status.get(step["id"])
+            if state == "failed":
+                result.append(step)
+            elif state == "ok" and step["health"] and not self.check(step):
+                result.append(step)
+        return result
+
+    def run(self):
+        print(f"[cyan]守护模式: 每 {self.interval}s 检查一次[/cyan]")
+        self.start_pass()
+        while True:
+            time.sleep(self.interval)
+            broken = self.broken()
+            if not broken:
+                continue
+            stale = downstream(self.steps, [step["id"] for step in broken])
+            stale -= self.busy()
+            if not stale:
+                continue
+            for step in broken:
+                if self.status.get(step["id"]) == "failed":
+                    print(f"[red]步骤失败: {step['description']} ({step['id']})[/red]")
+                else:
+                    print(f"[red]健康检查失败: {step['description']} ({step['id']})[/red]")
+            print("重新执行: " + ", ".join(
+                step["id"] for step in self.steps if step["id"] in stale))
+            self.start_pass(stale)
@@ -0,0 +1,211 @@
+# 记录步骤执行过程, 导出 JSON Lines 与 Chrome trace-event
+import json
+import os
+import threading
+import time
+
+
+def _repr(value, limit=200):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class Tracer:
+    def __init__(self):
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.origin = time.time()
+        self._clock = time.monotonic()
+        self._lock = threading.Lock()
+        self.steps = {}
+
+    def now(self):
+        """相对于开始时刻的秒数"""
+        return time.monotonic() - self._clock
+
+    def _record(self, step, status):
+        now = self.now()
+        return {
+            "id": step["id"],
+            "description": step["description"],
+            "procedure": step["procedure"],
+            "depends": list(step["depends"]),
+            "thread": threading.get_ident() if status == "running" else None,
+            "start": now,
+            "end": None if status == "running" else now,
+            "status": status,
+            "result": None,
+            "error": None,
+            "attempts": [],
+        }
+
+    def step_start(self, step):
+        with self._lock:
+            self.steps[step["id"]] = self._record(step, "running")
+
+    def step_thread(self, step_id):
+        """步骤改由当前线程执行 (协程步骤交给事件循环线程)"""
+        with self._lock:
+            self.steps[step_id]["thread"] = threading.get_ident()
+
+    def attempt(self, step_id, start, result=None, error=None):
+        with self._lock:
+            self.steps[step_id]["attempts"].append({
+                "start": start,
+                "end": self.now(),
+                "result": None if error else _repr(result),
+                "error": None if error is None else f"{type(error).__name__}: {error}",
+            })
+
+    def step_end(self, step_id, status, result=None, error=None):
+        with self._lock:
+            record = self.steps[step_id]
+            record["end"] = self.now()
+            record["status"] = status
+            record["result"] = None if error else _repr(result)
+            if error is not None:
+                record["error"] = f"{type(error).__name__}: {error}"
+
+    def step_skip(self, step):
+        with self._lock:
+            self.steps[step["id"]] = self._record(step, "skipped")
+
+    def procedures(self):
+        """按任务汇总: 任务的起止时间为其步骤的最早开始与最晚结束"""
+        spans = {}
+        for record in self.steps.values():
+            if record["end"] is None:
+                continue
+            span = spans.setdefault(record["procedure"], {
+                "procedure": record["procedure"],
+                "start": record["start"],
+                "end": record["end"],
+                "steps": 0,
+                "status": "ok",
+            })
+            span["start"] = min(span["start"], record["start"])
+            span["end"] = max(span["end"], record["end"])
+            span["steps"] += 1
+            if record["status"] != "ok":
+                span["status"] = record["status"]
+        return list(spans.values())
+
+    def critical_path(self):
+        """从最晚结束的步骤沿最晚结束的依赖回溯"""
+        finished = {k: v for k, v in self.steps.items() if v["end"] is not None}
+        if not finished:
+            return []
+        current = max(finished.values(), key=lambda r: r["end"])
+        path = [current]
+        while True:
+            depends = [finished[d] for d in current["depends"] if d in finished]
+            if not depends:
+                break
+            current = max(depends, key=lambda r: r["end"])
+            path.append(current)
+        return path[::-1]
+
+    def write_jsonl(self, path):
+        """每个任务与步骤一行, 追加写入以便积累多次运行的数据"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for span in self.procedures():
+                f.write(json.dumps(
+                    dict(span, type="procedure", run=self.run_id,
+                         origin=self.origin),
+                    ensure_ascii=False) + "\n")
+            for record in self.steps.values():
+                f.write(json.dumps(
+                    dict(record, type="step", run=self.run_id,
+                         origin=self.origin),
+                    ensure_ascii=False) + "\n")
+
+    def write_chrome(self, path):
+        """导出可在 chrome://tracing 或 Perfetto 中查看的 trace 文件"""
+        events = []
+        threads = {}
+
+        def tid(thread):
+            if thread not in threads:
+                threads[thread] = len(threads) + 1
+                events.append({
+                    "name": "thread_name", "ph": "M", "pid": 1,
+                    "tid": threads[thread],
+                    "args": {"name": f"worker-{threads[thread]}"},
+                })
+            return threads[thread]
+
+        def us(seconds):
+            return int(seconds * 1e6)
+
+        for index, span in enumerate(self.procedures()):
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": 0, "tid": index,
+                "args": {"name": span["procedure"]},
+            })
+            events.append({
+                "name": span["procedure"], "cat": "procedure", "ph": "X",
+                "pid": 0, "tid": index, "ts": us(span["start"]),
+                "dur": us(span["end"] - span["start"]),
+                "args": {"status": span["status"], "steps": span["steps"]},
+            })
+        for record in self.steps.values():
+            if record["end"] is None or record["thread"] is None:
+                continue
+            thread = tid(record["thread"])
+            events.append({
+                "name": record["description"], "cat": "step", "ph": "X",
+                "pid": 1, "tid": thread, "ts": us(record["start"]),
+                "dur": us(record["end"] - record["start"]),
+                "args": {
+                    "id": record["id"],
+                    "status": record["status"],
+                    "attempts": len(record["attempts"]),
+                    "result": record["result"],
+                    "error": record["error"],
+                },
+            })
+            for number, attempt in enumerate(record["attempts"], 1):
+                events.append({
+                    "name": f"attempt {number}", "cat": "attempt", "ph": "X",
+                    "pid": 1, "tid": thread, "ts": us(attempt["start"]),
+                    "dur": us(attempt["end"] - attempt["start"]),
+                    "args": {"result": attempt["result"],
+                             "error": attempt["error"]},
+                })
+        events.insert(0, {"name": "process_name", "ph": "M", "pid": 0,
+                          "args": {"name": "任务"}})
+        events.insert(1, {"name": "process_name", "ph": "M", "pid": 1,
+                          "args": {"name": "步骤"}})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"run": self.run_id}},
+                      f, ensure_ascii=False)
+
+    def print_profile(self):
+        from rich import print
+        from rich.table import Table
+
+        table = Table(title="关键路径")
+        table.add_column("步骤")
+        table.add_column("开始", justify="right")
+        table.add_column("耗时", justify="right")
+        table.add_column("尝试", justify="right")
+        table.add_column("状态")
+        path = self.critical_path()
+        for record in path:
+            table.add_row(
+                record["description"] + f" ({record['id']})",
+                f"{record['start']:.2f}s",
+                f"{record['end'] - record['start']:.2f}s",
+                str(len(record["attempts"])),
+                record["status"],
+            )
+        print(table)
+        if path:
+            busy = sum(r["end"] - r["start"] for r in path)
+            total = path[-1]["end"]
+            print(f"总耗时 {total:.2f}s, 关键路径步骤耗时 {busy:.2f}s, "
+                  f"等待调度 {total - busy:.2f}s")
+            slowest = max(path, key=lambda r: r["end"] - r["start"])
+            print(f"最慢的步骤: {slowest['description']} ({slowest['id']})")
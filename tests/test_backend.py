@@ -0,0 +1,44 @@
+import asyncio
+import shutil
+import sys
+
+import pytest
+
+from net import backend
+
+
+def test_fake_backend_events():
+    link = backend.FakeBackend(associate_delay=0.05, dhcp_delay=0.05, address="10.1.2.3")
+    events = []
+    link.subscribe(lambda old, new: events.append(new))
+    assert not link.wait_address(timeout=0.01)
+    link.connect("campus")
+    assert link.wait_address(timeout=2)
+    assert events == [
+        backend.LinkState(connected=True, ssid="campus"),
+        backend.LinkState(connected=True, ssid="campus", address="10.1.2.3"),
+    ]
+    # 状态不变时不推送
+    link.set_state(address="10.1.2.3")
+    assert len(events) == 2
+
+
+def test_fake_backend_wait_async():
+    link = backend.FakeBackend(associate_delay=0.05, dhcp_delay=0.05)
+
+    async def main():
+        link.connect("campus")
+        return await link.wait_address_async(timeout=2)
+
+    assert asyncio.run(main())
+    assert link._listeners == []
+
+
+def test_default_backend():
+    assert isinstance(backend.default("fake"), backend.FakeBackend)
+    with pytest.raises(ValueError):
+        backend.default("wifi")
+    if sys.platform != "win32" and not shutil.which("nmcli"):
+        # 没有可用的后端时不会退回模拟后端
+        with pytest.raises(RuntimeError):
+            backend.default()
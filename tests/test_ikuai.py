@@ -0,0 +1,51 @@
+from ikuai.core import IKuaiClient
+
+ROWS = list(range(25))
+
+
+def lister(page_cap=None, with_total=True):
+    """模拟路由器的列表接口, page_cap 为路由器单页最多返回的条数"""
+    calls = []
+
+    def list_func(limit):
+        offset, count = limit
+        calls.append(offset)
+        page = {"data": ROWS[offset:offset + min(count, page_cap or count)]}
+        if with_total:
+            page["total"] = len(ROWS)
+        return page
+
+    return list_func, calls
+
+
+def client(page_size=10):
+    return IKuaiClient("http://127.0.0.1", "admin", "admin", page_size=page_size)
+
+
+def test_paginate_until_total():
+    list_func, calls = lister()
+    assert list(client()._paginate(list_func)) == ROWS
+    assert calls == [0, 10, 20]
+
+
+def test_paginate_continues_past_capped_pages():
+    list_func, calls = lister(page_cap=4)
+    assert list(client()._paginate(list_func)) == ROWS
+    assert calls == [0, 4, 8, 12, 16, 20, 24]
+
+
+def test_paginate_exact_total_stops_without_extra_request():
+    list_func, calls = lister()
+    assert list(client(page_size=25)._paginate(list_func)) == ROWS
+    assert calls == [0]
+
+
+def test_paginate_without_total_stops_on_short_page():
+    list_func, calls = lister(with_total=False)
+    assert list(client()._paginate(list_func)) == ROWS
+    assert calls == [0, 10, 20]
+
+
+def test_paginate_stops_on_empty_page():
+    # total 偏大时以空页结束
+    assert list(client()._paginate(lambda limit: {"data": [], "total": 100})) == []
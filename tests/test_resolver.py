@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import runner.state
+from remote import resolver
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    """每个测试使用独立的 state.json"""
+    monkeypatch.setattr(runner.state, "PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(runner.state, "_data", None)
+    yield
+    # 在恢复 PATH 之前写入, 以免定时器把测试数据写进真正的 state.json
+    runner.state.flush()
+
+
+def source(name, wan, delay=0.0, lan=(), fail=False):
+    def fetch():
+        time.sleep(delay)
+        if fail:
+            raise Exception(f"{name} 不可用")
+        return {"wan": [wan], "lan": list(lan)}
+    return resolver.Source(name, fetch)
+
+
+def timed(resolve):
+    start = time.monotonic()
+    return resolve(), time.monotonic() - start
+
+
+def test_agrees_with_known_answer_immediately():
+    runner.state.put("ips", {"wan": ["1.1.1.1"], "lan": []})
+    r = resolver.Resolver([source("fast", "1.1.1.1", 0.01), source("slow", "2.2.2.2", 2)])
+    answer, elapsed = timed(lambda: r.resolve(refresh=True))
+    assert answer["wan"] == ["1.1.1.1"] and r.last == "fast"
+    assert elapsed < 0.5
+
+
+def test_changed_answer_confirmed_by_second_source():
+    runner.state.put("ips", {"wan": ["1.1.1.1"], "lan": []})
+    r = resolver.Resolver([source("a", "3.3.3.3", 0.01), source("b", "3.3.3.3", 0.1),
+                           source("c", "1.1.1.1", 2)], confirm=1.0)
+    answer, elapsed = timed(lambda: r.resolve(refresh=True))
+    assert answer["wan"] == ["3.3.3.3"] and r.last == "a"
+    assert elapsed < 0.5
+    assert runner.state.get("ips.sources")["a"]["wins"] == 1
+
+
+def test_unconfirmed_answer_after_confirm_window():
+    r = resolver.Resolver([source("a", "8.8.8.8", 0.01), source("b", "7.7.7.7", 3)],
+                          timeout=5, confirm=0.2)
+    answer, elapsed = timed(r.resolve)
+    assert answer["wan"] == ["8.8.8.8"] and r.last == "a"
+    assert 0.2 <= elapsed < 1
+
+
+def test_all_sources_failed():
+    r = resolver.Resolver([source("a", None, fail=True), source("b", "not an ip")])
+    with pytest.raises(Exception, match="无法获取IP") as error:
+        r.resolve()
+    assert "a 不可用" in str(error.value) and "结果无效" in str(error.value)
+
+
+def test_cached_answer():
+    r = resolver.Resolver([source("a", "1.1.1.1")], ttl=60)
+    assert r.resolve() == {"wan": ["1.1.1.1"], "lan": []}
+    r.sources = [source("a", None, fail=True)]
+    assert r.resolve()["wan"] == ["1.1.1.1"]
+
+
+def test_lan_keeps_private_addresses():
+    assert resolver.lan(["192.168.1.5", "8.8.8.8", "169.254.0.1", "10.0.0.2",
+                         "192.168.1.5", "bad"]) == ["192.168.1.5", "10.0.0.2"]
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from runner import retry
+
+
+def test_retry_backoff():
+    policy = retry.RetryPolicy(backoff="exponential", delay=1, factor=3, max_delay=5)
+    assert [policy.backoff_delay(n) for n in [1, 2, 3]] == [1, 3, 5]
+    assert retry.RetryPolicy(backoff="linear", delay=2).backoff_delay(3) == 6
+    jittered = retry.RetryPolicy(delay=10, jitter=0.5)
+    assert all(5 <= jittered.backoff_delay(1) <= 15 for _ in range(50))
+
+
+def test_retry_attempts_and_deadline():
+    policy = retry.RetryPolicy(attempts=2, delay=0)
+    assert policy.next_delay(1, time.monotonic()) == 0
+    assert policy.next_delay(2, time.monotonic()) is None
+    policy = retry.RetryPolicy(delay=3, deadline=10, timeout=20)
+    start = time.monotonic() - 8
+    assert policy.next_delay(1, start) is None
+    assert policy.attempt_timeout(start) == pytest.approx(2, abs=0.1)
+
+
+def test_retry_merge_and_validation():
+    policy = retry.RetryPolicy.merge({"attempts": 3, "delay": 1}, {"delay": 2}, None)
+    assert (policy.attempts, policy.delay, policy.backoff) == (3, 2, "constant")
+    for options in [{"tries": 1}, {"backoff": "random"}, {"jitter": 2}]:
+        with pytest.raises(ValueError):
+            retry.RetryPolicy(**options)
+
+
+def test_call_with_timeout():
+    with pytest.raises(retry.StepTimeout):
+        retry.call_with_timeout(lambda: time.sleep(1), 0.05)
+    assert retry.call_with_timeout(lambda: 1, 1) == 1
+
@@ -0,0 +1,127 @@
+import sys
+import threading
+import types
+
+import pytest
+
+from runner import scheduler
+
+
+@pytest.fixture
+def module():
+    """供步骤引用的临时任务模块"""
+    module = types.ModuleType("plan_steps")
+    sys.modules[module.__name__] = module
+    yield module
+    del sys.modules[module.__name__]
+
+
+def procedure(steps, **options):
+    return dict({"path": "plan_steps", "description": "测试任务", "steps": [
+        dict({"path": f"plan_steps.{name}", "description": name}, **extra)
+        for name, extra in steps]}, **options)
+
+
+def test_load_steps_dependencies():
+    steps = scheduler.load_steps([
+        procedure([("a", {}), ("b", {}), ("c", {"depends": []})],
+                  retry={"attempts": 2}),
+        procedure([("d", {"retry": {"attempts": 5}})], depends=["plan_steps.a"]),
+    ])
+    depends = {step["id"]: step["depends"] for step in steps}
+    assert depends == {"plan_steps.a": [], "plan_steps.b": ["plan_steps.a"],
+                       "plan_steps.c": [], "plan_steps.d": ["plan_steps.a"]}
+    assert [step["retry"].attempts for step in steps] == [2, 2, 2, 5]
+
+
+def test_load_steps_errors():
+    with pytest.raises(scheduler.PlanError, match="循环"):
+        scheduler.load_steps([procedure([("a", {"depends": ["plan_steps.b"]}), ("b", {})])])
+    with pytest.raises(scheduler.PlanError, match="不存在"):
+        scheduler.load_steps([procedure([("a", {"depends": ["missing"]})])])
+    with pytest.raises(scheduler.PlanError, match="重复"):
+        scheduler.load_steps([procedure([("a", {}), ("a", {})])])
+
+
+def test_run_parallel_and_skip(module):
+    calls = []
+    both = threading.Barrier(2, timeout=2)
+
+    def step(name, fail=False):
+        def func():
+            calls.append(name)
+            if name in ["a", "b"]:
+                # a 与 b 没有依赖关系, 应同时执行
+                both.wait()
+            if fail:
+                raise Exception(f"{name} 失败")
+            return True
+        setattr(module, name, func)
+
+    step("a")
+    step("b", fail=True)
+    step("c")
+    step("d")
+    steps = scheduler.load_steps([procedure([
+        ("a", {}),
+        ("b", {"depends": [], "retry": {"attempts": 1}}),
+        ("c", {"depends": ["plan_steps.a", "plan_steps.b"]}),
+        ("d", {"depends": ["plan_steps.a"]}),
+    ])])
+    status = {}
+    assert scheduler.run(steps, workers=4, status=status) is False
+    assert sorted(calls) == ["a", "b", "d"]
+    assert status == {"plan_steps.a": "ok", "plan_steps.b": "failed",
+                      "plan_steps.c": "failed", "plan_steps.d": "ok"}
+
+
+def test_run_retries_then_succeeds(module):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Exception("暂时失败")
+        return True
+
+    module.flaky = flaky
+    steps = scheduler.load_steps([procedure([("flaky", {"retry": {"delay": 0}})])])
+    assert scheduler.run(steps) is True
+    assert len(attempts) == 3
+
+
+def test_run_only(module):
+    module.a = lambda: pytest.fail("不应执行")
+    module.b = lambda: True
+    steps = scheduler.load_steps([procedure([("a", {}), ("b", {})])])
+    status = {}
+    assert scheduler.run(steps, only={"plan_steps.b"}, status=status) is True
+    assert status == {"plan_steps.b": "ok"}
+
+
+def test_run_coroutine_step_with_timeout(module):
+    import asyncio
+
+    attempts = []
+
+    async def slow():
+        attempts.append(1)
+        if len(attempts) == 1:
+            # 第一次超时被取消, 第二次成功
+            await asyncio.sleep(5)
+        return True
+
+    module.slow = slow
+    steps = scheduler.load_steps([procedure([
+        ("slow", {"retry": {"delay": 0, "timeout": 0.1}})])])
+    assert scheduler.run(steps) is True
+    assert len(attempts) == 2
+
+
+def test_scheduler_import_does_not_load_asyncio():
+    import os
+    import subprocess
+    code = "import sys, runner.plan; print('asyncio' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(scheduler.__file__)))
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,56 @@
+import pytest
+
+from net import srun
+
+# 已知结果由认证页 jquery.srun.portal.js 的 xEncode/base64 在 node 中直接计算得到
+TOKEN = "8e4ab3f0b0c0c1d1b1f1e5e9d8a7c6b5a4f3e2d1c0b9a8f7e6d5c4b3a2f1e0d9"
+INFO = ("{SRBX1}eCaz3WHA+1wo6Qp7SZPaQ7SFefoVs1FWsg1XUwbBFWs7N84C82VLN3RWpHRBLbf"
+        "ysEHsLW3BKIctwICASIRc5PVfm2XpsPr4uqSMgquRQ642uclV7RxnXj1g43t8mtP/8serg"
+        "q3cNq2=")
+
+
+def test_xencode_known_answers():
+    assert srun.b64encode(srun.xencode("abc", "k")) == "A2o+UhFLj39="
+    assert srun.b64encode(srun.xencode("hello world, srun", "0123456789abcdef")) == \
+        "ZbJ9hX5LqJULIDATbZqeuNX+bxOv5MZZ"
+    assert srun.xencode("", "key") == ""
+
+
+def test_login_params_known_answer():
+    params = srun.login_params("201900001", "p@ssw0rd!", "1", "10.12.34.56", TOKEN)
+    assert params["info"] == INFO
+    assert params["password"] == "{MD5}85c03523a66243ccca6fa2e8c7e6d4af"
+    assert params["chksum"] == "c56fa06511e381364742c5c0a567d5e002b1acd2"
+
+
+def test_login_against_fake_portal():
+    from bench.fakes import Network
+    network = Network()
+    client = srun.SrunClient(network.portal.url, "bench", "bench")
+    assert client.status() is None
+    assert client.login() is True
+    assert network.logged_in
+    assert client.status()["online_ip"] == "127.0.0.1"
+
+
+def test_login_rejects_wrong_password():
+    from bench.fakes import Network
+    network = Network()
+    client = srun.SrunClient(network.portal.url, "bench", "wrong")
+    with pytest.raises(srun.SrunError, match="sign_error"):
+        client.login()
+    assert not network.logged_in
+    # 被拒绝后重新获取了一次 challenge
+    assert len(network.challenges) == 2
+
+
+def test_login_async_against_fake_portal():
+    import asyncio
+
+    from bench.fakes import Network
+    network = Network()
+    client = srun.SrunClient(network.portal.url, "bench", "bench")
+    assert asyncio.run(client.login_async()) is True
+    assert network.logged_in
+    # 同步与协程版本共用 challenge
+    assert client.challenge() == asyncio.run(client.challenge_async())
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def workstation():
+    # procedure 模块在导入时读取 settings, 使用基准测试的模拟服务配置
+    from bench.fakes import Network
+    from bench.run import install_settings
+    install_settings(Network())
+    import procedure.workstation
+    return procedure.workstation
+
+
+class BlockingFetch:
+    """阻塞到 release() 的 fetch, 记录调用次数"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def release(self):
+        self.released.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.released.wait(2)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def call_all(get, count):
+    results = [None] * count
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, get()))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_gets_share_one_fetch(workstation):
+    registry = workstation.DeviceRegistry(ttl=10)
+    fetch = BlockingFetch([["device"]])
+    threads, results = call_all(lambda: registry.get(fetch), 5)
+    assert fetch.started.wait(2)
+    time.sleep(0.05)
+    fetch.release()
+    for thread in threads:
+        thread.join(2)
+    assert fetch.calls == 1
+    assert results == [["device"]] * 5
+    assert registry.get(fetch) == ["device"]
+
+
+def test_waiter_retries_after_failed_fetch(workstation):
+    registry = workstation.DeviceRegistry(ttl=10)
+    fetch = BlockingFetch([Exception("云端不可用"), ["device"]])
+    errors = []
+
+    def get():
+        try:
+            return registry.get(fetch)
+        except Exception as e:
+            errors.append(e)
+
+    threads, results = call_all(get, 3)
+    assert fetch.started.wait(2)
+    time.sleep(0.05)
+    fetch.release()
+    for thread in threads:
+        thread.join(2)
+    # 发起查询的线程得到异常, 等待中的线程由其中一个重新查询
+    assert len(errors) == 1 and fetch.calls == 2
+    assert sorted(map(str, results)) == ["None", "['device']", "['device']"]
+
+
+def test_invalidate_drops_fetch_in_flight(workstation):
+    registry = workstation.DeviceRegistry(ttl=10)
+    fetch = BlockingFetch([["stale"]])
+    threads, _ = call_all(lambda: registry.get(fetch), 1)
+    assert fetch.started.wait(2)
+    registry.invalidate()
+    fetch.release()
+    threads[0].join(2)
+    assert registry.get(lambda: ["fresh"]) == ["fresh"]
+
+
+def test_get_async_single_flight_and_invalidate(workstation):
+    registry = workstation.DeviceRegistry(ttl=10)
+    calls = []
+
+    async def fetch(result, delay):
+        calls.append(result)
+        await asyncio.sleep(delay)
+        return [result]
+
+    async def main():
+        first = [asyncio.ensure_future(registry.get_async(lambda: fetch("stale", 0.2)))
+                 for _ in range(3)]
+        await asyncio.sleep(0.05)
+        registry.invalidate()
+        fresh = await registry.get_async(lambda: fetch("fresh", 0))
+        return await asyncio.gather(*first), fresh
+
+    first, fresh = asyncio.run(main())
+    assert calls == ["stale", "fresh"]
+    assert first == [["stale"]] * 3 and fresh == ["fresh"]
+    assert registry.get(lambda: ["other"]) == ["fresh"]